@@ -5,25 +5,30 @@ Example: python add_language.py 21 french
 
 This script will:
 1. Verify the language HTML file exists in languages/ folder
-2. Recreate the entire database with all languages (including the new one)
+2. Import just that file into the existing database (or, with --full,
+   recreate the entire database with all languages)
 """
 
 import sys
 import os
 import re
-from create_database import create_database
+import argparse
+from create_database import create_database, update_database
 
 def main():
-    if len(sys.argv) != 3:
-        print("Usage: python add_language.py <number> <language_name>")
-        print("Example: python add_language.py 21 french")
-        print("\nThis assumes you have already created a file like:")
-        print("  languages/21-french.html")
-        print("\nThe script will then recreate the database with all languages.")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description='Add a language to the database',
+        epilog='This assumes you have already created a file like languages/21-french.html')
+    parser.add_argument('number', help='two-digit file number, e.g. 21')
+    parser.add_argument('language_name', help='language name, e.g. french')
+    parser.add_argument('--full', action='store_true',
+                        help='recreate the entire database instead of importing only this file')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='processes used to parse language files (default: CPU count)')
+    args = parser.parse_args()
     
-    number = sys.argv[1]
-    language_name = sys.argv[2].lower()
+    number = args.number
+    language_name = args.language_name.lower()
     
     # Validate number format (should be 2 digits)
     if not re.match(r'^\d{2}$', number):
@@ -68,19 +73,20 @@ def main():
     
     print(f"  File contains ~{answer_count} answer blocks")
     
-    # Recreate the database
-    print(f"\n[2/2] Recreating database with all languages...")
-    print("  (This will include your new language)")
-    print()
-    
-    # Delete old database
     db_path = 'grant_database.db'
-    if os.path.exists(db_path):
-        os.remove(db_path)
-        print(f"  ✓ Removed old database")
-    
-    # Create new database (this will discover all languages including the new one)
-    create_database(db_path)
+    if args.full:
+        print(f"\n[2/2] Recreating database with all languages...")
+        print("  (This will include your new language)")
+        print()
+        
+        # Create new database next to the old one and swap it in (this will discover all languages including the new one)
+        create_database(db_path, args.jobs)
+    else:
+        print(f"\n[2/2] Importing {expected_file} into the database...")
+        print()
+        
+        # Only this file is parsed; it is skipped if unchanged since its last import
+        update_database(db_path, only=[expected_file], jobs=args.jobs)
     
     print("\n" + "=" * 70)
     print(f"✓ Successfully added {language_name} to the database!")
@@ -88,8 +94,7 @@ def main():
     print("\nNext steps:")
     print("1. Verify the database: python test_database.py")
     print("2. Update PostgreSQL schema if needed: python export_to_postgres.py")
-    print("3. Update the fallback language list in app.py")
-    print(f"   Add '{language_name}' to the list in get_language_columns()")
+    print("The API picks up the new language automatically once the database file changes.")
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,245 @@
+"""
+Single-pass tokenizer for the <answer> blocks of language HTML files.
+
+A language file is read once, as bytes, in fixed-size chunks that are decoded
+incrementally and scanned for answer blocks, so memory is bounded by the
+largest answer rather than by the file. Blocks are read exactly as the
+regular expression the importer used to run over the whole decoded file:
+
+    (\\d+(?:\\.\\d+)*)[.\\s]*<answer>(.*?)</answer>    (DOTALL, IGNORECASE)
+
+but in linear time, and anything that expression skipped or merged without a
+trace (a block with no question number in front of it, an <answer> opened
+inside another block, a stray or missing </answer>) is reported with its
+line number.
+"""
+import codecs
+import io
+import re
+from collections import namedtuple
+from typing import Iterator, List, Optional, Tuple
+
+# Bytes read from the file at a time
+CHUNK_SIZE = 64 * 1024
+
+NON_ASCII_PATTERN = re.compile(rb'[\x80-\xff]')
+
+# Opening or closing answer tag, matched case-insensitively as before
+ANSWER_TAG_PATTERN = re.compile(r'<(/?)answer>', re.IGNORECASE)
+
+# A tag can straddle two chunks: hold back this many characters for the next one
+TAG_OVERLAP = len('</answer>') - 1
+
+BYTE_ORDER_MARKS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# Tried in order on the sample when there is no BOM; latin-1 never fails
+FALLBACK_ENCODINGS = ('utf-8', 'cp1251', 'latin-1')
+
+AnswerBlock = namedtuple('AnswerBlock', ['number', 'html', 'line'])
+
+def detect_encoding(sample: bytes, final: bool = False) -> Optional[str]:
+    """Pick the encoding of a language file from a sample of its bytes.
+
+    A byte order mark wins; UTF-16 without one is recognised by the zero
+    bytes ASCII markup leaves in every other position. Otherwise the first
+    of utf-8, cp1251 and latin-1 that decodes the sample is used.
+
+    Returns None while the sample cannot tell them apart: it is plain ASCII,
+    which reads the same in all three, or its only other bytes are the start
+    of a BOM or of a character that the next bytes complete. Pass final=True
+    for the last sample of the file to force a decision.
+    """
+    for bom, encoding in BYTE_ORDER_MARKS:
+        if sample.startswith(bom):
+            return encoding
+        if not final and bom.startswith(sample):
+            return None
+
+    if sample.count(0) > len(sample) // 4:
+        return 'utf-16-le' if sample[1::2].count(0) > sample[0::2].count(0) else 'utf-16-be'
+
+    if sample.isascii():
+        return None
+
+    for encoding in FALLBACK_ENCODINGS:
+        try:
+            text = codecs.getincrementaldecoder(encoding)().decode(sample, final=final)
+        except UnicodeDecodeError:
+            continue
+        return None if text.isascii() else encoding
+
+def _is_number_char(char: str) -> bool:
+    """True for the characters of the number and separator before <answer>: [\\d.\\s]."""
+    return char == '.' or char.isdecimal() or char.isspace()
+
+def question_number_before(text: str) -> Optional[str]:
+    """Return the question number that `text` ends with, ignoring trailing dots and whitespace.
+
+    `text` holds only digits, dots and whitespace. The number is the longest
+    run of dot-separated digits before the trailing separators, which is
+    what the leftmost match of (\\d+(?:\\.\\d+)*)[.\\s]* ending at <answer>
+    captures; None if there is no digit.
+    """
+    end = len(text)
+    while end and not text[end - 1].isdecimal():
+        end -= 1
+    if not end:
+        return None
+
+    start = end
+    while start:
+        if text[start - 1].isdecimal():
+            start -= 1
+        elif text[start - 1] == '.' and start >= 2 and text[start - 2].isdecimal():
+            start -= 1
+        else:
+            break
+    return text[start:end]
+
+class AnswerTokenizer:
+    """Incremental scanner: feed() decoded text in pieces, then close().
+
+    Both return the answer blocks completed so far. Problems are appended to
+    `issues` as (line, message) tuples.
+    """
+
+    def __init__(self, issues: Optional[List[Tuple[int, str]]] = None):
+        self.issues = issues if issues is not None else []
+        self.line = 1          # line number at the start of the unscanned text
+        self.pending = ''      # unscanned text held back for the next piece
+        self.number_run = ''   # trailing [\d.\s]* of the text since the last tag
+        self.block = None      # (number, line) of the open block
+        self.parts = []        # text of the open block
+        self.orphan_line = None  # line of an <answer> skipped for lack of a number
+
+    def feed(self, text: str) -> List[AnswerBlock]:
+        buffer = self.pending + text
+        blocks = []
+        position = 0
+
+        for match in ANSWER_TAG_PATTERN.finditer(buffer):
+            self._consume(buffer, position, match.start())
+            position = match.end()
+
+            if match.group(1):
+                self._close_tag(blocks)
+            else:
+                self._open_tag(match.group(0))
+
+        keep = max(position, len(buffer) - TAG_OVERLAP)
+        self._consume(buffer, position, keep)
+        self.pending = buffer[keep:]
+        return blocks
+
+    def close(self) -> List[AnswerBlock]:
+        blocks = self.feed('')
+        self._consume(self.pending, 0, len(self.pending))
+        self.pending = ''
+
+        if self.block is not None:
+            number, line = self.block
+            self.issues.append((line, f'<answer> for {number} is never closed; '
+                                      f'it and the rest of the file are skipped'))
+            self.block = None
+        return blocks
+
+    def _consume(self, buffer: str, start: int, end: int):
+        """Move past buffer[start:end], text that contains no tag."""
+        if start >= end:
+            return
+        self.line += buffer.count('\n', start, end)
+
+        if self.block is not None:
+            self.parts.append(buffer[start:end])
+            return
+
+        # Outside a block only the digits, dots and whitespace just before
+        # the next tag matter
+        cut = end
+        while cut > start and _is_number_char(buffer[cut - 1]):
+            cut -= 1
+        if cut == start:
+            self.number_run += buffer[start:end]
+        else:
+            self.number_run = buffer[cut:end]
+
+    def _open_tag(self, tag: str):
+        if self.block is not None:
+            number, line = self.block
+            self.issues.append((self.line, f'<answer> inside the answer to {number} opened at line {line}; '
+                                           f'read as part of that answer'))
+            self.parts.append(tag)
+            return
+
+        number = question_number_before(self.number_run)
+        self.number_run = ''
+        if number is None:
+            self.issues.append((self.line, '<answer> has no question number in front of it; block skipped'))
+            self.orphan_line = self.line
+            return
+
+        self.block = (number, self.line)
+        self.parts = []
+        self.orphan_line = None
+
+    def _close_tag(self, blocks: List[AnswerBlock]):
+        self.number_run = ''
+        if self.block is None:
+            if self.orphan_line is None:
+                self.issues.append((self.line, '</answer> without a matching <answer>'))
+            self.orphan_line = None
+            return
+
+        number, line = self.block
+        blocks.append(AnswerBlock(number, ''.join(self.parts).strip(), line))
+        self.block = None
+        self.parts = []
+
+def iter_answer_blocks(path: str, issues: Optional[List[Tuple[int, str]]] = None,
+                       chunk_size: int = CHUNK_SIZE) -> Iterator[AnswerBlock]:
+    """Stream the answer blocks of a language file in file order.
+
+    The encoding is detected from the first chunk that is not plain ASCII
+    and line endings are normalised to \\n as in text mode. Problems with
+    the file's markup are appended to `issues` as (line, message) tuples.
+
+    Raises:
+        ValueError: If the file stops decoding in the encoding it was
+            detected as
+    """
+    tokenizer = AnswerTokenizer(issues)
+    newlines = io.IncrementalNewlineDecoder(None, translate=True)
+    encoding = decoder = None
+    undecided = b''
+
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            final = not chunk
+
+            if decoder is None:
+                chunk = undecided + chunk
+                encoding = detect_encoding(chunk, final)
+                if encoding is None:
+                    # Plain ASCII so far: pass it on and keep the bytes that
+                    # could still go either way for the next sample
+                    match = NON_ASCII_PATTERN.search(chunk)
+                    ascii_end = match.start() if match else len(chunk)
+                    chunk, undecided = chunk[:ascii_end], chunk[ascii_end:]
+                else:
+                    decoder = codecs.getincrementaldecoder(encoding)()
+
+            try:
+                text = decoder.decode(chunk, final=final) if decoder else chunk.decode('ascii')
+            except UnicodeDecodeError as e:
+                raise ValueError(f"Could not decode {path} as {encoding} "
+                                 f"after line {tokenizer.line}: {e.reason}") from e
+            yield from tokenizer.feed(newlines.decode(text, final=final))
+            if final:
+                break
+
+    yield from tokenizer.close()
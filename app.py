@@ -1,30 +1,506 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, g, make_response, stream_with_context
 from flask_cors import CORS
-import sqlite3
+from werkzeug.http import is_resource_modified
+import base64
+import bisect
+import functools
+import hashlib
+import json
+import threading
 import os
+import re
+from urllib.parse import urlencode
+from storage import StorageUnavailable, open_storage
+from response_cache import ResponseCache
+from compression import StreamCompressor, compress, compress_variants, negotiate_encoding
+from question_sampler import QuestionSampler
+from create_database import question_sort_key
 
 app = Flask(__name__)
 CORS(app)
 
+# Maximum number of questions returned by /api/search
+SEARCH_LIMIT = 100
+
+# Page size of /api/questions when ?limit= is absent
+DEFAULT_PAGE_SIZE = 100
+
+# Largest page a paginated endpoint returns
+MAX_PAGE_SIZE = 1000
+
+# Questions read per query while streaming NDJSON
+NDJSON_BATCH_SIZE = 200
+
+# Question ids bound per IN (...) list
+ID_BATCH_SIZE = 500
+
+# Most question numbers one /api/questions/batch request may ask for
+MAX_BATCH_IDS = 500
+
+# A question number, optionally followed by .* to include its sub-questions
+BATCH_ID_PATTERN = re.compile(r'^(\d+(?:\.\d+)*)(\.\*)?$')
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+# Question fields selectable with ?fields=, and the column each one reads
+QUESTION_FIELDS = {
+    'id': 'q.id',
+    'question_number': 'q.question_number',
+    'group_id': 'q.group_id',
+    'question_text': 'q.question_text',
+    'sort_key': 'q.sort_key',
+    'group_number': 'g.group_number',
+    'group_name': 'g.group_name'
+}
+
+# Cache-Control sent with dataset-derived responses
+CACHE_CONTROL = os.environ.get('GRANT_CACHE_CONTROL', 'public, max-age=300')
+
+# Responses smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = int(os.environ.get('GRANT_COMPRESS_MIN_BYTES', 1024))
+
+# SQLite file (GRANT_DB_PATH) or Postgres (GRANT_STORAGE=postgres), see storage.py
+storage = open_storage()
+
+# Load the schema metadata at startup; endpoints reload it only when the
+# dataset changes
+try:
+    storage.warm()
+except storage.errors + (StorageUnavailable,) as e:
+    app.logger.warning('Schema metadata not loaded at startup: %s', e)
+
 def get_db():
-    conn = sqlite3.connect('grant_database.db')
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Get the pooled connection for the current app context."""
+    if 'db' not in g:
+        g.db = storage.acquire()
+    return g.db
+
+@app.teardown_appcontext
+def release_db(exception):
+    """Return the request's connection to the pool."""
+    conn = g.pop('db', None)
+    if conn is not None:
+        storage.release(conn)
+
+def get_dataset_version():
+    """Get (build_id, built_at) for the dataset currently being served."""
+    # Through the request's connection, so an unreachable database is found
+    # (and answered with 503) before the view runs
+    return storage.dataset_version(get_db())
+
+@app.errorhandler(StorageUnavailable)
+def storage_unavailable(e):
+    """The database is down or not loaded yet: ask clients to retry later."""
+    return jsonify({'error': str(e)}), 503
+
+def normalized_args():
+    """Query arguments in a canonical order, for cache keys."""
+    # Encoded, so that a value containing & or = cannot pass for other arguments
+    return urlencode(sorted(request.args.items(multi=True)))
+
+def representation():
+    """Name of the response format negotiated for this request, for cache keys."""
+    return 'ndjson' if wants_ndjson() else 'json'
+
+def content_encoding():
+    """Content coding negotiated for this request: 'br', 'gzip' or 'identity'."""
+    return negotiate_encoding(request.accept_encodings) or 'identity'
+
+def http_cached(view=None, when=None):
+    """Add ETag, Last-Modified and Cache-Control to a dataset-derived view.
+    
+    The ETag is derived from the dataset version and the normalized request
+    URL, so conditional requests (If-None-Match / If-Modified-Since) are
+    answered with 304 before the view runs. With when=predicate, only
+    requests for which the predicate is true are treated as cacheable.
+    """
+    if view is None:
+        return functools.partial(http_cached, when=when)
+    
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if when is not None and not when():
+            return view(*args, **kwargs)
+        
+        try:
+            build_id, built_at = get_dataset_version()
+        except storage.errors + (TypeError,) as e:
+            return jsonify({'error': str(e)}), 500
+        
+        # Each content coding is a different representation, so it gets its own ETag
+        etag = hashlib.sha1(
+            f'{build_id}|{request.path}|{normalized_args()}|{representation()}|{content_encoding()}'.encode('utf-8')
+        ).hexdigest()
+        
+        if not is_resource_modified(request.environ, etag=etag, last_modified=built_at):
+            response = make_response('', 304)
+        else:
+            response = make_response(view(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+        
+        response.set_etag(etag)
+        response.last_modified = built_at
+        response.headers['Cache-Control'] = CACHE_CONTROL
+        response.vary.add('Accept')
+        response.vary.add('Accept-Encoding')
+        return response
+    return wrapper
+
+response_cache = ResponseCache(
+    max_entries=int(os.environ.get('GRANT_RESPONSE_CACHE_ENTRIES', 1024)),
+    max_bytes=int(os.environ.get('GRANT_RESPONSE_CACHE_MB', 64)) * 1024 * 1024,
+    ttl=float(os.environ.get('GRANT_RESPONSE_CACHE_TTL', 3600))
+)
+
+def response_cached(view=None, when=None):
+    """Serve a view's JSON from the in-memory response cache.
+    
+    Entries are keyed by endpoint, URL arguments and query arguments, and
+    are dropped when the dataset version changes. Only 200 responses are
+    cached, and with when=predicate only requests for which it is true.
+    Each entry is compressed once into every supported encoding and the
+    variant matching the request's Accept-Encoding is served.
+    """
+    if view is None:
+        return functools.partial(response_cached, when=when)
+    
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if when is not None and not when():
+            return view(*args, **kwargs)
+        
+        try:
+            build_id, _ = get_dataset_version()
+        except storage.errors + (TypeError,) as e:
+            return jsonify({'error': str(e)}), 500
+        
+        key = (request.endpoint, tuple(sorted(kwargs.items())), normalized_args(), representation())
+        cached = response_cache.get(build_id, key)
+        if cached is not None:
+            variants, mimetype = cached
+            return encoded_response(variants, mimetype)
+        
+        response = make_response(view(*args, **kwargs))
+        if response.status_code != 200 or response.is_streamed:
+            return response
+        
+        variants = compress_variants(response.get_data(), COMPRESS_MIN_BYTES)
+        response_cache.put(build_id, key, variants, response.mimetype)
+        return encoded_response(variants, response.mimetype, response)
+    return wrapper
+
+def encoded_response(variants, mimetype, response=None):
+    """Build a response from the cached variant matching Accept-Encoding.
+    
+    Reuses response (keeping its headers) when given.
+    """
+    encoding = content_encoding()
+    if encoding not in variants:
+        encoding = 'identity'
+    
+    if response is None:
+        response = app.response_class(mimetype=mimetype)
+    response.set_data(variants[encoding])
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    return response
+
+@app.after_request
+def compress_response(response):
+    """Compress uncached JSON responses, e.g. unseeded random draws.
+    
+    Cached responses are already encoded; streamed NDJSON is sent as is.
+    """
+    if (response.status_code != 200 or response.is_streamed or response.direct_passthrough
+            or 'Content-Encoding' in response.headers or not response.is_json):
+        return response
+    
+    response.vary.add('Accept-Encoding')
+    encoding = negotiate_encoding(request.accept_encodings)
+    if encoding is None or response.content_length < COMPRESS_MIN_BYTES:
+        return response
+    
+    body = compress(response.get_data(), encoding)
+    if len(body) < response.content_length:
+        response.set_data(body)
+        response.headers['Content-Encoding'] = encoding
+    return response
+
+_sampler = {'version': None, 'sampler': None}
+_sampler_lock = threading.Lock()
+
+def get_sampler():
+    """Get the question sampler for the dataset the request's connection reads.
+    
+    The build id is read through that same connection: a pooled connection
+    can still have a replaced build open, and a sampler from another build
+    would hand out ids the connection cannot find.
+    """
+    conn = get_db()
+    try:
+        row = conn.execute('SELECT build_id FROM build_info').fetchone()
+    except storage.errors:
+        # Databases built before build ids existed
+        row = None
+    build_id = row[0] if row is not None else get_dataset_version()[0]
+    with _sampler_lock:
+        if _sampler['version'] == build_id:
+            return _sampler['sampler']
+    
+    sampler = QuestionSampler.load(conn)
+    with _sampler_lock:
+        _sampler['version'] = build_id
+        _sampler['sampler'] = sampler
+    return sampler
 
 def get_language_columns():
-    """Get list of language columns dynamically from database."""
+    """Get the sorted list of language columns of the questions table."""
+    return storage.languages(get_db())
+
+def list_arg(name):
+    """Read a list argument from the query string or a JSON POST body.
+    
+    The query string form is comma-separated (?langs=a,b); a JSON body may
+    give a list or a comma-separated string.
+    
+    Returns:
+        List of distinct non-empty items, or None when the argument is absent
+    
+    Raises:
+        ValueError: if the body value is neither a list nor a string
+    """
+    raw = request.args.get(name)
+    if raw is None and request.method == 'POST':
+        body = request.get_json(silent=True)
+        if isinstance(body, dict):
+            raw = body.get(name)
+    if raw is None:
+        return None
+    
+    if isinstance(raw, str):
+        raw = raw.split(',')
+    if not isinstance(raw, list):
+        raise ValueError(f'{name} must be a list or a comma-separated string')
+    return list(dict.fromkeys([str(item).strip() for item in raw if str(item).strip()]))
+
+def parse_langs_arg():
+    """Parse the optional ?langs=a,b argument.
+    
+    Returns:
+        List of requested language names, or None when the argument is absent
+    
+    Raises:
+        ValueError: if a requested language does not exist, or none is named
+    """
+    raw = list_arg('langs')
+    if raw is None:
+        return None
+    if not raw:
+        # ?langs= would otherwise select no languages at all
+        raise ValueError(f'langs must name at least one language. Use: {", ".join(get_language_columns())}')
+    
+    langs = list(dict.fromkeys([lang.lower() for lang in raw]))
+    available = get_language_columns()
+    unknown = [lang for lang in langs if lang not in available]
+    if unknown:
+        raise ValueError(f'Invalid language(s): {", ".join(unknown)}. Use: {", ".join(available)}')
+    return langs
+
+def parse_fields_arg():
+    """Parse the optional ?fields=a,b argument selecting question fields.
+    
+    Returns:
+        List of requested field names, or None when the argument is absent
+    
+    Raises:
+        ValueError: if a requested field does not exist, or none is named
+    """
+    fields = list_arg('fields')
+    if fields is None:
+        return None
+    if not fields:
+        # ?fields= would otherwise drop every question field
+        raise ValueError(f'fields must name at least one field. Use: {", ".join(QUESTION_FIELDS)}')
+    
+    unknown = [field for field in fields if field not in QUESTION_FIELDS]
+    if unknown:
+        raise ValueError(f'Invalid field(s): {", ".join(unknown)}. Use: {", ".join(QUESTION_FIELDS)}')
+    return fields
+
+def project_questions(questions, fields):
+    """Drop the internal id/sort_key fields a ?fields= request did not ask for."""
+    if fields is None:
+        return questions
+    hidden = [field for field in ('id', 'sort_key') if field not in fields]
+    for question in questions:
+        for field in hidden:
+            question.pop(field, None)
+    return questions
+
+def fetch_questions(cursor, where_sql, params, langs=None, order_by='q.sort_key', limit=None, fields=None):
+    """Fetch questions with group info and their answers.
+    
+    Args:
+        cursor: Database cursor
+        where_sql: Condition on questions q / groups g, with ? placeholders
+        params: Parameters for where_sql
+        langs: Languages to include; None includes every language column
+        order_by: ORDER BY expression
+        limit: Maximum number of questions, or None for all
+        fields: Question fields (see QUESTION_FIELDS) to select; None selects
+            all. id and sort_key are always fetched for ordering, paging and
+            answer lookup; project_questions() drops them afterwards.
+    
+    Only the requested columns are selected. With langs set, answers come
+    from the long-format answers table so only the requested languages are
+    read and returned.
+    """
+    limit_sql = f'LIMIT {int(limit)}' if limit is not None else ''
+    
+    names = list(QUESTION_FIELDS) if fields is None else list(dict.fromkeys(['id', 'sort_key'] + fields))
+    columns = [f'{QUESTION_FIELDS[name]} AS {name}' for name in names]
+    if langs is None:
+        columns += [f'q.{lang}' for lang in get_language_columns()]
+    
+    cursor.execute(f"""
+        SELECT {', '.join(columns)}
+        FROM questions q
+        JOIN groups g ON q.group_id = g.id
+        WHERE {where_sql}
+        ORDER BY {order_by}
+        {limit_sql}
+    """, params)
+    questions = [dict(row) for row in cursor.fetchall()]
+    if not questions or not langs:
+        return questions
+    
+    by_id = {}
+    for question in questions:
+        question.update({lang: '' for lang in langs})
+        by_id[question['id']] = question
+    
+    lang_placeholders = ', '.join(['?'] * len(langs))
+    question_ids = list(by_id)
+    for start in range(0, len(question_ids), ID_BATCH_SIZE):
+        batch = question_ids[start:start + ID_BATCH_SIZE]
+        cursor.execute(f"""
+            SELECT a.question_id, l.name, a.html
+            FROM answers a
+            JOIN languages l ON a.language_id = l.id
+            WHERE l.name IN ({lang_placeholders})
+              AND a.question_id IN ({', '.join(['?'] * len(batch))})
+        """, list(langs) + batch)
+        for row in cursor.fetchall():
+            by_id[row['question_id']][row['name']] = row['html']
+    return questions
+
+def encode_cursor(values):
+    """Encode keyset position values as an opaque pagination cursor."""
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor_arg, types):
+    """Decode a pagination cursor produced by encode_cursor().
+    
+    Args:
+        types: Expected type of each value, e.g. (str,) for a sort_key;
+            values are bound as SQL parameters, so anything else is rejected
+    
+    Raises:
+        ValueError: if the cursor is malformed
+    """
     try:
-        conn = get_db()
-        cursor = conn.cursor()
-        # SQLite syntax for getting column names
-        cursor.execute("PRAGMA table_info(questions)")
-        columns = cursor.fetchall()
-        languages = [col[1] for col in columns if col[1] not in ('id', 'question_number', 'group_id', 'question_text')]
-        conn.close()
-        return sorted(languages)
-    except:
-        # Fallback to original languages if query fails
-        return ['abaza', 'bulgarian', 'danish', 'greben', 'icari', 'kumyk', 'macedonian', 'mountmari', 'muira', 'nanai', 'nganasan', 'northernkhanty', 'norwegian', 'nornakhichevan', 'polish', 'russian', 'turkish', 'udmurt', 'ulch', 'westcircassian']
+        padded = cursor_arg + '=' * (-len(cursor_arg) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, UnicodeError):
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError('Invalid cursor')
+    for value, expected in zip(values, types):
+        # JSON true/false decode to bool, which is an int subclass
+        if isinstance(value, bool) or not isinstance(value, expected):
+            raise ValueError('Invalid cursor')
+    return values
+
+def parse_page_args(default_limit=None, max_limit=MAX_PAGE_SIZE):
+    """Parse ?limit= and ?cursor= for keyset pagination.
+    
+    Returns:
+        (limit, cursor) where limit is default_limit when absent and cursor
+        is the raw cursor string or None
+    
+    Raises:
+        ValueError: for an out-of-range limit
+    """
+    limit = request.args.get('limit', default_limit, type=int)
+    if limit is not None and not 1 <= limit <= max_limit:
+        raise ValueError(f'limit must be between 1 and {max_limit}')
+    return limit, request.args.get('cursor')
+
+def fetch_question_page(cursor, where_sql, params, langs, limit, after=None, fields=None):
+    """Fetch one keyset page of questions ordered by sort_key.
+    
+    Args:
+        after: sort_key of the last question on the previous page
+    
+    Returns:
+        (questions, next_cursor) where next_cursor is None on the last page
+    """
+    if after is not None:
+        where_sql = f'({where_sql}) AND q.sort_key > ?'
+        params = list(params) + [after]
+    questions = fetch_questions(cursor, where_sql, params, langs, limit=limit + 1, fields=fields)
+    
+    next_cursor = None
+    if len(questions) > limit:
+        questions = questions[:limit]
+        next_cursor = encode_cursor([questions[-1]['sort_key']])
+    return questions, next_cursor
+
+def wants_ndjson():
+    """True if the client asked for newline-delimited JSON."""
+    if request.args.get('format') == 'ndjson':
+        return True
+    return request.accept_mimetypes.best == NDJSON_MIMETYPE
+
+def stream_questions(where_sql, params, langs, after=None, limit=None, fields=None):
+    """Stream questions as NDJSON, one object per line, in sort_key order.
+    
+    Questions are read in keyset batches, so memory use stays bounded no
+    matter how large the result is. Each batch is compressed and flushed
+    as it is sent when the client accepts gzip or brotli.
+    """
+    def generate():
+        cursor = get_db().cursor()
+        position = after
+        remaining = limit
+        while remaining is None or remaining > 0:
+            batch_size = NDJSON_BATCH_SIZE if remaining is None else min(NDJSON_BATCH_SIZE, remaining)
+            questions, next_cursor = fetch_question_page(
+                cursor, where_sql, params, langs, batch_size, position, fields)
+            if next_cursor is not None:
+                position = questions[-1]['sort_key']
+            yield ''.join(app.json.dumps(question) + '\n'
+                          for question in project_questions(questions, fields)).encode('utf-8')
+            if next_cursor is None:
+                break
+            if remaining is not None:
+                remaining -= len(questions)
+    
+    encoding = negotiate_encoding(request.accept_encodings)
+    if encoding is None:
+        return app.response_class(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
+    
+    def generate_compressed():
+        compressor = StreamCompressor(encoding)
+        for chunk in generate():
+            yield compressor.compress(chunk)
+        yield compressor.finish()
+    
+    response = app.response_class(stream_with_context(generate_compressed()), mimetype=NDJSON_MIMETYPE)
+    response.headers['Content-Encoding'] = encoding
+    return response
 
 @app.route('/')
 def index():
@@ -35,15 +511,22 @@ def index():
         'endpoints': {
             '/api/languages': 'Get available languages',
             '/api/groups': 'Get all groups with question counts',
-            '/api/questions/group/<group_number>': 'Get all questions in a group',
-            '/api/questions/random/<group_number>': 'Get random question(s) from a group',
-            '/api/questions/<question_number>': 'Get specific question by number',
-            '/api/search?q=<query>': 'Search questions and answers',
-            '/api/stats': 'Get database statistics'
+            '/api/questions?fields=&langs=&limit=&cursor=&format=ndjson': 'Get all questions, paginated or streamed as NDJSON',
+            '/api/questions/group/<group_number>?fields=&langs=<a,b>&limit=&cursor=': 'Get all questions in a group',
+            '/api/questions/random/<group_number>?fields=&langs=&count=&seed=&weight=coverage': 'Get random question(s) from one or more groups (1,3,5 or all)',
+            '/api/questions/<question_number>?fields=&langs=<a,b>': 'Get specific question by number',
+            '/api/questions/batch?ids=1.1,2.4.*&fields=&langs=': 'Get many questions by number in one call (also POST {"ids": [...]})',
+            '/api/search?q=<query>&mode=fulltext|substring&fields=&langs=&limit=&cursor=': 'Full-text search over questions and answers ("phrase", prefix*), or substring search',
+            '/api/compare?questions=3.*,1.1&langs=&mode=bitmap': 'Question x language matrix of answered flags and answer lengths',
+            '/api/stats': 'Get database statistics',
+            '/api/pool': 'Get connection pool statistics for this worker',
+            '/api/cache': 'Get response cache statistics for this worker'
         }
     })
 
 @app.route('/api/languages')
+@http_cached
+@response_cached
 def get_languages():
     """Get list of available languages."""
     try:
@@ -56,30 +539,43 @@ def get_languages():
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/groups')
+@http_cached
+@response_cached
 def get_groups():
     """Get all groups with names and question counts."""
     try:
         conn = get_db()
         cursor = conn.cursor()
         cursor.execute("""
-            SELECT 
-                g.group_number,
-                g.group_name,
-                COUNT(q.id) as question_count
-            FROM groups g
-            LEFT JOIN questions q ON g.id = q.group_id
-            GROUP BY g.group_number, g.group_name
-            ORDER BY CAST(g.group_number AS INTEGER)
+            SELECT group_number, group_name, question_count
+            FROM group_stats
+            ORDER BY position
         """)
         groups = [dict(row) for row in cursor.fetchall()]
-        conn.close()
         return jsonify(groups)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/questions/group/<group_number>')
+@http_cached
+@response_cached
 def get_group_questions(group_number):
-    """Get all questions in a specific group with group information."""
+    """Get all questions in a specific group with group information.
+    
+    ?langs=russian,polish limits the answers to the listed languages and
+    ?fields=question_number,question_text the question fields.
+    ?limit=N returns one page plus a next_cursor to pass as ?cursor=.
+    format=ndjson (or Accept: application/x-ndjson) streams the questions
+    one per line.
+    """
+    try:
+        langs = parse_langs_arg()
+        fields = parse_fields_arg()
+        limit, cursor_arg = parse_page_args()
+        after = decode_cursor(cursor_arg, (str,))[0] if cursor_arg else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     try:
         conn = get_db()
         cursor = conn.cursor()
@@ -93,192 +589,486 @@ def get_group_questions(group_number):
         group_info = cursor.fetchone()
         
         if not group_info:
-            conn.close()
             return jsonify({'error': 'Group not found'}), 404
         
+        if wants_ndjson():
+            return stream_questions('g.group_number = ?', (group_number,), langs, after, limit, fields)
+        
         # Get questions in this group with group info
-        cursor.execute("""
-            SELECT q.*, g.group_number, g.group_name
-            FROM questions q
-            JOIN groups g ON q.group_id = g.id
-            WHERE g.group_number = ? 
-            ORDER BY CAST(SUBSTR(q.question_number, 1, INSTR(q.question_number, '.') - 1) AS INTEGER),
-                     CAST(SUBSTR(q.question_number, INSTR(q.question_number, '.') + 1) AS INTEGER)
-        """, (group_number,))
-        questions = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        if limit is None and after is None:
+            questions = fetch_questions(cursor, 'g.group_number = ?', (group_number,), langs, fields=fields)
+            return jsonify({
+                'group': dict(group_info),
+                'questions': project_questions(questions, fields)
+            })
         
+        questions, next_cursor = fetch_question_page(
+            cursor, 'g.group_number = ?', (group_number,), langs, limit or MAX_PAGE_SIZE, after, fields)
         return jsonify({
             'group': dict(group_info),
-            'questions': questions
+            'questions': project_questions(questions, fields),
+            'next_cursor': next_cursor
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/questions')
+@http_cached
+@response_cached
+def get_all_questions():
+    """Get every question, one keyset page at a time, in sort_key order.
+    
+    ?limit=N (default 100, max 1000) sets the page size and the returned
+    next_cursor is passed back as ?cursor= for the next page. ?langs=
+    limits the answers and ?fields= the question fields. format=ndjson (or Accept: application/x-ndjson)
+    streams the whole corpus, from ?cursor= on, one question per line.
+    """
+    try:
+        langs = parse_langs_arg()
+        fields = parse_fields_arg()
+        limit, cursor_arg = parse_page_args()
+        after = decode_cursor(cursor_arg, (str,))[0] if cursor_arg else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        if wants_ndjson():
+            return stream_questions('1 = 1', (), langs, after, limit, fields)
+        
+        cursor = get_db().cursor()
+        questions, next_cursor = fetch_question_page(
+            cursor, '1 = 1', (), langs, limit or DEFAULT_PAGE_SIZE, after, fields)
+        return jsonify({
+            'count': len(questions),
+            'questions': project_questions(questions, fields),
+            'next_cursor': next_cursor
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def is_seeded():
+    """True if the request asks for a reproducible random draw."""
+    return request.args.get('seed') is not None
+
 @app.route('/api/questions/random/<group_number>')
+@http_cached(when=is_seeded)
+@response_cached(when=is_seeded)
 def get_random_question(group_number):
-    """Get random question(s) from a group."""
+    """Get random question(s) from one or more groups.
+    
+    group_number may be a single group, a comma-separated list (1,3,5) or
+    "all". Optional parameters:
+        count: number of distinct questions (default 1, max 50)
+        seed: makes the draw reproducible (and cacheable)
+        weight=coverage: favour questions answered in more languages
+        langs, fields: limit the languages and question fields returned
+    """
+    try:
+        langs = parse_langs_arg()
+        fields = parse_fields_arg()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     # Get count parameter (default 1)
     count = request.args.get('count', 1, type=int)
-    count = min(count, 50)  # Limit to 50 questions max
+    count = max(1, min(count, 50))  # Limit to 50 questions max
+    seed = request.args.get('seed')
+    weight = request.args.get('weight')
+    if weight not in (None, 'coverage'):
+        return jsonify({'error': 'Invalid weight. Use: coverage'}), 400
     
     try:
-        conn = get_db()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT q.*, g.group_number, g.group_name
-            FROM questions q
-            JOIN groups g ON q.group_id = g.id
-            WHERE g.group_number = ? 
-            ORDER BY RANDOM() 
-            LIMIT ?
-        """, (group_number, count))
-        questions = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        sampler = get_sampler()
+        if group_number == 'all':
+            groups = sampler.all_groups()
+        else:
+            groups = list(dict.fromkeys([group.strip() for group in group_number.split(',') if group.strip()]))
         
-        if not questions:
+        try:
+            question_ids = sampler.sample(groups, count, seed=seed, weighted=weight == 'coverage')
+        except KeyError:
             return jsonify({'error': 'Group not found'}), 404
-            
-        return jsonify(questions)
+        
+        if not question_ids:
+            return jsonify({'error': 'Group not found'}), 404
+        
+        cursor = get_db().cursor()
+        id_placeholders = ', '.join(['?'] * len(question_ids))
+        rows = fetch_questions(cursor, f'q.id IN ({id_placeholders})', question_ids, langs, fields=fields)
+        by_id = {row['id']: row for row in rows}
+        questions = [by_id[question_id] for question_id in question_ids]
+        
+        response = jsonify(project_questions(questions, fields))
+        if seed is None:
+            response.headers['Cache-Control'] = 'no-store'
+        return response
+    except StorageUnavailable:
+        raise
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def is_get():
+    """True for GET requests; POST bodies are not part of the cache keys."""
+    return request.method == 'GET'
+
+def parse_batch_ids(ids, expand=False, arg_name='ids'):
+    """Split requested question numbers into exact numbers and sub-question ranges.
+    
+    "2.4.*" (or "2.4" with expand) stands for 2.4 and all of its
+    sub-questions, which share the sort_key prefix "0002.0004". arg_name is
+    the request argument the ids came from, for error messages.
+    
+    Returns:
+        (sort_keys, ranges): the sort_keys of exact numbers, and a map from
+        each wildcard id to its [low, high) sort_key range
+    
+    Raises:
+        ValueError: for a malformed id or too many ids
+    """
+    if not ids:
+        raise ValueError(f'{arg_name} is required, e.g. {arg_name}=1.1,2.4.*')
+    if len(ids) > MAX_BATCH_IDS:
+        raise ValueError(f'At most {MAX_BATCH_IDS} {arg_name} per request')
+    
+    numbers = []
+    ranges = {}
+    for question_id in ids:
+        match = BATCH_ID_PATTERN.match(question_id)
+        if not match:
+            raise ValueError(f'Invalid question number: {question_id}')
+        number, wildcard = match.groups()
+        if wildcard or expand:
+            low = question_sort_key(number)
+            # '/' sorts right after '.', so this covers "low" and "low.*"
+            ranges[question_id] = (low, low + '/')
+        else:
+            numbers.append(question_sort_key(number))
+    return numbers, ranges
+
+def batch_ids_condition(sort_keys, ranges):
+    """WHERE clause on questions q for the output of parse_batch_ids()."""
+    conditions = []
+    params = []
+    if sort_keys:
+        conditions.append(f'q.sort_key IN ({", ".join(["?"] * len(sort_keys))})')
+        params.extend(sort_keys)
+    for low, high in ranges.values():
+        conditions.append('(q.sort_key >= ? AND q.sort_key < ?)')
+        params.extend([low, high])
+    return ' OR '.join(conditions), params
+
+def match_batch_id(question_id, ranges, sort_keys):
+    """The sort_keys, from a sorted list of fetched ones, that a requested id covers."""
+    if question_id in ranges:
+        low, high = ranges[question_id]
+        return sort_keys[bisect.bisect_left(sort_keys, low):bisect.bisect_left(sort_keys, high)]
+    sort_key = question_sort_key(BATCH_ID_PATTERN.match(question_id).group(1))
+    index = bisect.bisect_left(sort_keys, sort_key)
+    return sort_keys[index:index + 1] if index < len(sort_keys) and sort_keys[index] == sort_key else []
+
+@app.route('/api/questions/batch', methods=['GET', 'POST'])
+@http_cached(when=is_get)
+@response_cached(when=is_get)
+def get_questions_batch():
+    """Get many questions by number in one call.
+    
+    Takes ?ids=1.1,2.4.*,... or a JSON body {"ids": [...]}. "2.4.*" (or
+    any id with expand=true) also returns the question's sub-questions.
+    langs and fields work as on the other question endpoints. Questions
+    come back in request order without duplicates; ids that matched
+    nothing are listed under "missing".
+    """
+    try:
+        langs = parse_langs_arg()
+        fields = parse_fields_arg()
+        ids = list_arg('ids')
+        expand = request.args.get('expand')
+        if expand is None and request.method == 'POST':
+            body = request.get_json(silent=True)
+            expand = body.get('expand') if isinstance(body, dict) else None
+        numbers, ranges = parse_batch_ids(ids, str(expand).lower() in ('1', 'true'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        where_sql, params = batch_ids_condition(numbers, ranges)
+        
+        # One query for every requested number and range, in sort_key order
+        cursor = get_db().cursor()
+        rows = fetch_questions(cursor, where_sql, params, langs, fields=fields)
+        sort_keys = [row['sort_key'] for row in rows]
+        by_sort_key = dict(zip(sort_keys, rows))
+        
+        questions = []
+        seen = set()
+        missing = []
+        for question_id in ids:
+            matched = [by_sort_key[sort_key] for sort_key in match_batch_id(question_id, ranges, sort_keys)]
+            if not matched:
+                missing.append(question_id)
+            for row in matched:
+                if row['id'] not in seen:
+                    seen.add(row['id'])
+                    questions.append(row)
+        
+        return jsonify({
+            'count': len(questions),
+            'questions': project_questions(questions, fields),
+            'missing': missing
+        })
+    except StorageUnavailable:
+        raise
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/questions/<question_number>')
+@http_cached
+@response_cached
 def get_question(question_number):
-    """Get a specific question by its number."""
+    """Get a specific question by its number.
+    
+    ?langs=russian,polish limits the answers to the listed languages and
+    ?fields=question_number,question_text the question fields.
+    """
+    try:
+        langs = parse_langs_arg()
+        fields = parse_fields_arg()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     try:
         conn = get_db()
         cursor = conn.cursor()
-        cursor.execute("""
-            SELECT q.*, g.group_number, g.group_name
-            FROM questions q
-            JOIN groups g ON q.group_id = g.id
-            WHERE q.question_number = ?
-        """, (question_number,))
-        question = cursor.fetchone()
-        conn.close()
-        
-        if not question:
+        questions = fetch_questions(cursor, 'q.question_number = ?', (question_number,), langs, fields=fields)
+        
+        if not questions:
             return jsonify({'error': 'Question not found'}), 404
             
-        return jsonify(dict(question))
+        return jsonify(project_questions(questions, fields)[0])
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/search')
+@http_cached
+@response_cached
 def search_questions():
-    """Search across all questions and answers."""
+    """Search across all questions and answers.
+    
+    Terms are ANDed together; "quoted text" is a phrase query and a trailing
+    * makes a prefix query. Results are ranked by relevance (lower rank is
+    better) and carry highlighted snippets for every matching language.
+    ?mode=substring instead matches q as a case-insensitive substring of the
+    text, in question order. ?limit=N (max 100) sets the page size; pass the
+    returned next_cursor as ?cursor= for the next page. ?langs= and ?fields=
+    limit the answers and question fields returned (lang= still selects what
+    is searched).
+    """
     query = request.args.get('q', '')
     language = request.args.get('lang', 'all')
+    mode = request.args.get('mode', 'fulltext')
     
     if not query:
         return jsonify({'error': 'Query parameter q is required'}), 400
+    if mode not in ('fulltext', 'substring'):
+        return jsonify({'error': 'mode must be fulltext or substring'}), 400
+    
+    try:
+        langs = parse_langs_arg()
+        fields = parse_fields_arg()
+        limit, cursor_arg = parse_page_args(SEARCH_LIMIT, SEARCH_LIMIT)
+        after = decode_cursor(cursor_arg, ((int, float), str)) if cursor_arg else None
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    search = storage.compile_search(query, substring=mode == 'substring')
+    if search is None:
+        return jsonify({'error': 'Query parameter q contains no searchable terms'}), 400
     
     try:
         conn = get_db()
         cursor = conn.cursor()
         
-        # Get available languages
-        languages = get_language_columns()
-        
-        # Build search query based on language
-        if language == 'all':
-            # Search across question_text and all language columns
-            where_clauses = ['q.question_text LIKE ?'] + [f'q.{lang} LIKE ?' for lang in languages]
-            search_sql = f"""
-                SELECT q.*, g.group_number, g.group_name
-                FROM questions q
-                JOIN groups g ON q.group_id = g.id
-                WHERE {' OR '.join(where_clauses)}
-                ORDER BY CAST(SUBSTR(q.question_number, 1, INSTR(q.question_number, '.') - 1) AS INTEGER),
-                         CAST(SUBSTR(q.question_number, INSTR(q.question_number, '.') + 1) AS INTEGER)
-                LIMIT 100
-            """
-            search_pattern = f'%{query}%'
-            cursor.execute(search_sql, (search_pattern,) * (len(languages) + 1))
-        else:
-            # Search in specific language
-            valid_languages = ['question_text'] + languages
+        # Restrict to one language if requested
+        search_language = None
+        if language != 'all':
+            valid_languages = ['question_text'] + get_language_columns()
             if language not in valid_languages:
                 return jsonify({'error': f'Invalid language. Use: {", ".join(valid_languages)}'}), 400
-            
-            search_sql = f"""
-                SELECT q.*, g.group_number, g.group_name
-                FROM questions q
-                JOIN groups g ON q.group_id = g.id
-                WHERE q.{language} LIKE ?
-                ORDER BY CAST(SUBSTR(q.question_number, 1, INSTR(q.question_number, '.') - 1) AS INTEGER),
-                         CAST(SUBSTR(q.question_number, INSTR(q.question_number, '.') + 1) AS INTEGER)
-                LIMIT 100
-            """
-            cursor.execute(search_sql, (f'%{query}%',))
+            search_language = language
         
-        results = [dict(row) for row in cursor.fetchall()]
-        conn.close()
+        ranked = storage.search(cursor, search, search_language, limit + 1, after)
+        
+        next_cursor = None
+        if len(ranked) > limit:
+            ranked = ranked[:limit]
+            next_cursor = encode_cursor(list(ranked[-1][1:]))
+        
+        results = []
+        if ranked:
+            question_ids = [question_id for question_id, _, _ in ranked]
+            id_placeholders = ', '.join(['?'] * len(question_ids))
+            
+            # Highlighted snippets for every matching language
+            matches = storage.search_snippets(cursor, search, search_language, question_ids)
+            
+            rows = fetch_questions(cursor, f'q.id IN ({id_placeholders})', question_ids, langs, fields=fields)
+            by_id = {row['id']: row for row in rows}
+            
+            for question_id, rank, _ in ranked:
+                result = by_id[question_id]
+                result['rank'] = rank
+                result['matches'] = matches.get(question_id, [])
+                results.append(result)
+            project_questions(results, fields)
         
         return jsonify({
             'query': query,
             'language': language,
+            'mode': mode,
             'count': len(results),
-            'results': results
+            'results': results,
+            'next_cursor': next_cursor
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/compare')
+@http_cached
+@response_cached
+def compare_languages():
+    """Question x language matrix of which languages answer which questions.
+    
+    ?questions= takes the same ids as /api/questions/batch ("3.*" is a whole
+    group) and ?langs= the languages to compare (default: all). Each
+    question row lists, per language in the order of "languages", whether
+    it is answered and the answer's plain-text length (0 when unanswered).
+    ?mode=bitmap returns only a '0'/'1' string per question instead.
+    """
+    mode = request.args.get('mode', 'matrix')
+    if mode not in ('matrix', 'bitmap'):
+        return jsonify({'error': 'Invalid mode. Use: matrix, bitmap'}), 400
+    
+    try:
+        langs = parse_langs_arg() or get_language_columns()
+        ids = list_arg('questions')
+        numbers, ranges = parse_batch_ids(ids, request.args.get('expand', '').lower() in ('1', 'true'),
+                                          arg_name='questions')
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        where_sql, params = batch_ids_condition(numbers, ranges)
+        cursor = get_db().cursor()
+        
+        # question_number -> (sort_key, answered flags, lengths or None), in sort_key order
+        rows = {}
+        if mode == 'bitmap':
+            # Answered flags are precomputed per question by create_database.py,
+            # one '0'/'1' per language in language_coverage.position order
+            cursor.execute('SELECT language, position FROM language_coverage')
+            position = {row['language']: row['position'] for row in cursor.fetchall()}
+            indexes = [position[lang] for lang in langs]
+            cursor.execute(f"""
+                SELECT q.question_number, q.sort_key, c.bitmap
+                FROM questions q
+                JOIN question_coverage c ON c.question_id = q.id
+                WHERE {where_sql}
+                ORDER BY q.sort_key
+            """, params)
+            for row in cursor.fetchall():
+                answered = [row['bitmap'][index] == '1' for index in indexes]
+                rows[row['question_number']] = (row['sort_key'], answered, None)
+        else:
+            # Every (question, language) pair in one pass; unanswered pairs have no answers row
+            cursor.execute(f"""
+                SELECT q.question_number, q.sort_key, l.name, a.length
+                FROM questions q
+                JOIN languages l ON l.name IN ({', '.join(['?'] * len(langs))})
+                LEFT JOIN answers a ON a.question_id = q.id AND a.language_id = l.id
+                WHERE {where_sql}
+                ORDER BY q.sort_key
+            """, list(langs) + params)
+            
+            column = {lang: index for index, lang in enumerate(langs)}
+            for row in cursor.fetchall():
+                lengths = rows.setdefault(row['question_number'], (row['sort_key'], None, [None] * len(langs)))[2]
+                lengths[column[row['name']]] = row['length']
+            rows = {question_number: (sort_key, [length is not None for length in lengths], lengths)
+                    for question_number, (sort_key, _, lengths) in rows.items()}
+        
+        questions = []
+        answered_per_language = [0] * len(langs)
+        for question_number, (_, answered, lengths) in rows.items():
+            for index, is_answered in enumerate(answered):
+                answered_per_language[index] += is_answered
+            
+            question = {'question_number': question_number}
+            if mode == 'bitmap':
+                question['bitmap'] = ''.join('1' if is_answered else '0' for is_answered in answered)
+            else:
+                question['answered'] = answered
+                question['lengths'] = [length or 0 for length in lengths]
+            questions.append(question)
+        
+        sort_keys = [sort_key for sort_key, _, _ in rows.values()]
+        return jsonify({
+            'languages': langs,
+            'answered_per_language': answered_per_language,
+            'questions': questions,
+            'missing': [question_id for question_id in ids if not match_batch_id(question_id, ranges, sort_keys)]
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/stats')
+@http_cached
+@response_cached
 def get_stats():
-    """Get database statistics."""
+    """Get database statistics precomputed by create_database.py."""
     try:
         conn = get_db()
         cursor = conn.cursor()
         
-        # Total questions
-        cursor.execute("SELECT COUNT(*) as total FROM questions")
-        total = cursor.fetchone()['total']
-        
-        # Total groups
-        cursor.execute("SELECT COUNT(*) as total FROM groups")
-        total_groups = cursor.fetchone()['total']
+        cursor.execute("SELECT key, value FROM stats")
+        stats = {row['key']: row['value'] for row in cursor.fetchall()}
         
         # Questions by group with names
         cursor.execute("""
-            SELECT 
-                g.group_number,
-                g.group_name,
-                COUNT(q.id) as count
-            FROM groups g
-            LEFT JOIN questions q ON g.id = q.group_id
-            GROUP BY g.group_number, g.group_name
-            ORDER BY CAST(g.group_number AS INTEGER)
+            SELECT group_number, group_name, question_count as count
+            FROM group_stats
+            ORDER BY position
         """)
         by_group = [dict(row) for row in cursor.fetchall()]
         
-        # Get available languages
-        languages = get_language_columns()
-        
-        # Build dynamic query for complete responses
-        if languages:
-            conditions = ' AND '.join([f"{lang} IS NOT NULL AND {lang} != ''" for lang in languages])
-            cursor.execute(f"""
-                SELECT COUNT(*) as complete FROM questions
-                WHERE {conditions}
-            """)
-            complete = cursor.fetchone()['complete']
-        else:
-            complete = 0
-        
-        conn.close()
+        cursor.execute("""
+            SELECT language, answered, percentage,
+                   length_min, length_p50, length_p90, length_p99, length_max
+            FROM language_coverage
+            ORDER BY position
+        """)
+        coverage = [dict(row) for row in cursor.fetchall()]
         
         return jsonify({
-            'total_questions': total,
-            'total_groups': total_groups,
-            'complete_responses': complete,
-            'available_languages': languages,
-            'by_group': by_group
+            'total_questions': stats['total_questions'],
+            'total_groups': stats['total_groups'],
+            'complete_responses': stats['complete_responses'],
+            'available_languages': get_language_columns(),
+            'by_group': by_group,
+            'language_coverage': coverage
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/pool')
+def get_pool_stats():
+    """Get connection pool statistics for this worker process."""
+    return jsonify(storage.get_stats())
+
+@app.route('/api/cache')
+def get_cache_stats():
+    """Get response cache statistics for this worker process."""
+    return jsonify(response_cache.get_stats())
+
 if __name__ == '__main__':
     # Use PORT environment variable or default to 5000
     port = int(os.environ.get('PORT', 5000))
@@ -0,0 +1,363 @@
+"""
+Benchmarks for the API and the importer.
+
+The API benchmark drives app.py through Flask's test client with realistic
+query mixes (Cyrillic and Latin search terms, random groups, batch lookups,
+...) and records p50/p95/p99 latency and throughput per scenario, both with
+the response cache cleared before every request (cold) and with every
+request already cached (warm).
+
+The importer benchmark times every create_database() stage on the
+languages/ corpus and on a generated synthetic corpus (200 languages x
+5,000 questions by default).
+
+Results are written as JSON so runs can be compared across commits:
+
+    python benchmark.py --output bench-before.json
+    python benchmark.py --output bench-after.json
+    python benchmark.py --compare bench-before.json bench-after.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import openpyxl
+
+from create_database import create_database, percentile
+
+# Words sampled from the corpus for search queries
+CYRILLIC_WORD_PATTERN = re.compile(r'[А-Яа-яЁё]{5,}')
+LATIN_WORD_PATTERN = re.compile(r'[A-Za-z]{5,}')
+
+# Vocabulary of the synthetic answers
+SYNTHETIC_WORDS = (
+    'клауза', 'подлежащее', 'контроль', 'подъем', 'инфинитив', 'причастие', 'деепричастие',
+    'согласование', 'падеж', 'глагол', 'местоимение', 'рефлексив', 'модальность', 'залог',
+    'clause', 'subject', 'control', 'raising', 'infinitive', 'participle', 'agreement',
+    'case', 'verb', 'pronoun', 'reflexive', 'modality', 'voice', 'complementizer'
+)
+
+def get_commit():
+    """Current git commit of the working tree, or None outside a repository."""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def summarize(latencies, elapsed):
+    """Latency percentiles in milliseconds and throughput for one scenario run."""
+    ordered = sorted(latencies)
+    return {
+        'requests': len(ordered),
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+        'mean_ms': round(statistics.mean(ordered) * 1000, 3),
+        'throughput_rps': round(len(ordered) / elapsed, 1) if elapsed > 0 else None
+    }
+
+def sample_terms(conn, pattern, count, rng):
+    """Frequent words of the answers and question texts matching pattern."""
+    frequency = {}
+    for (text,) in conn.execute('SELECT text FROM answers UNION ALL SELECT question_text FROM questions'):
+        for word in pattern.findall(text):
+            word = word.lower()
+            frequency[word] = frequency.get(word, 0) + 1
+    common = sorted(frequency, key=frequency.get, reverse=True)[:count * 4]
+    return rng.sample(common, min(count, len(common)))
+
+def build_scenarios(db_path, seed):
+    """Request generators for every API scenario, fed from the database's own data.
+
+    Returns:
+        Dict mapping scenario names to functions returning (method, url, json_body)
+    """
+    rng = random.Random(seed)
+    conn = sqlite3.connect(db_path)
+    try:
+        groups = [row[0] for row in conn.execute('SELECT group_number FROM groups')]
+        numbers = [row[0] for row in conn.execute('SELECT question_number FROM questions')]
+        parents = sorted({number.rsplit('.', 1)[0] for number in numbers if number.count('.') > 1})
+        languages = [row[0] for row in conn.execute('SELECT name FROM languages ORDER BY position')]
+        cyrillic = sample_terms(conn, CYRILLIC_WORD_PATTERN, 40, rng)
+        latin = sample_terms(conn, LATIN_WORD_PATTERN, 40, rng)
+    finally:
+        conn.close()
+
+    def langs():
+        return ','.join(rng.sample(languages, min(3, len(languages))))
+
+    def search(terms):
+        term = rng.choice(terms)
+        kind = rng.random()
+        if kind < 0.2:
+            term = term[:4] + '*'
+        elif kind < 0.3:
+            term = f'{term} {rng.choice(terms)}'
+        return 'GET', f'/api/search?q={term}', None
+
+    def batch():
+        ids = rng.sample(numbers, min(20, len(numbers)))
+        if parents:
+            ids.append(rng.choice(parents) + '.*')
+        return 'GET', f'/api/questions/batch?ids={",".join(ids)}', None
+
+    def batch_post():
+        return 'POST', '/api/questions/batch', {'ids': rng.sample(numbers, min(50, len(numbers))), 'langs': langs()}
+
+    return {
+        'languages': lambda: ('GET', '/api/languages', None),
+        'groups': lambda: ('GET', '/api/groups', None),
+        'stats': lambda: ('GET', '/api/stats', None),
+        'group': lambda: ('GET', f'/api/questions/group/{rng.choice(groups)}', None),
+        'group_langs': lambda: ('GET', f'/api/questions/group/{rng.choice(groups)}?langs={langs()}', None),
+        'question': lambda: ('GET', f'/api/questions/{rng.choice(numbers)}', None),
+        'random': lambda: ('GET', f'/api/questions/random/{rng.choice(groups)}?count=5', None),
+        'random_seeded': lambda: ('GET', f'/api/questions/random/all?count=20&seed={rng.randrange(50)}', None),
+        'search_cyrillic': lambda: search(cyrillic),
+        'search_latin': lambda: search(latin),
+        'batch': batch,
+        'batch_post': batch_post,
+        'compare': lambda: ('GET', f'/api/compare?questions={rng.choice(groups)}.*&langs={langs()}', None),
+        'bulk_page': lambda: ('GET', '/api/questions?limit=100&fields=question_number,question_text', None),
+        'bulk_ndjson': lambda: ('GET', f'/api/questions?format=ndjson&langs={langs()}', None)
+    }
+
+def benchmark_api(db_path, requests_per_scenario, seed, only=None):
+    """Run every API scenario cold and warm.
+
+    Returns:
+        Dict mapping scenario names to {'cold': summary, 'warm': summary}
+    """
+    # app.py reads its configuration at import time
+    os.environ['GRANT_DB_PATH'] = db_path
+    import app as api
+
+    client = api.app.test_client()
+    headers = {'Accept-Encoding': 'gzip'}
+    results = {}
+
+    for name, make_request in build_scenarios(db_path, seed).items():
+        if only and name not in only:
+            continue
+        results[name] = {}
+        requests = [make_request() for _ in range(requests_per_scenario)]
+        for mode in ('cold', 'warm'):
+            api.response_cache.clear()
+            if mode == 'warm':
+                # Replay the cold run's requests once untimed to fill the cache
+                for method, url, body in requests:
+                    client.open(url, method=method, json=body, headers=headers).get_data()
+
+            latencies = []
+            started = time.perf_counter()
+            for method, url, body in requests:
+                if mode == 'cold':
+                    api.response_cache.clear()
+                request_started = time.perf_counter()
+                response = client.open(url, method=method, json=body, headers=headers)
+                response.get_data()
+                latencies.append(time.perf_counter() - request_started)
+                if response.status_code != 200:
+                    raise RuntimeError(f'{method} {url} returned {response.status_code}: {response.get_data()[:200]}')
+            results[name][mode] = summarize(latencies, time.perf_counter() - started)
+
+        cold, warm = results[name]['cold'], results[name]['warm']
+        print(f"  {name:16s} cold p50 {cold['p50_ms']:8.2f} ms  p99 {cold['p99_ms']:8.2f} ms  "
+              f"{cold['throughput_rps']:8.1f} req/s | warm p50 {warm['p50_ms']:8.2f} ms  "
+              f"{warm['throughput_rps']:8.1f} req/s")
+    return results
+
+def generate_corpus(directory, language_count, question_count, seed):
+    """Write a synthetic quest.xlsx and languages/ folder into directory.
+
+    Questions are spread over groups of 100; every tenth question has three
+    sub-questions. Each language answers about 90% of the questions with
+    short HTML answers mixing Cyrillic and Latin words.
+
+    Returns:
+        (excel_path, languages_dir)
+    """
+    rng = random.Random(seed)
+    excel_path = os.path.join(directory, 'quest.xlsx')
+    languages_dir = os.path.join(directory, 'languages')
+    os.makedirs(languages_dir)
+
+    numbers = []
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet()
+    group_number = 0
+    question_number = 0
+    while len(numbers) < question_count:
+        if question_number % 100 == 0:
+            group_number += 1
+            question_number = 0
+            ws.append([f'{group_number}. Группа {group_number}', None, None])
+        question_number += 1
+        number = f'{group_number}.{question_number}'
+        numbers.append(number)
+        ws.append([None, f'{number}. Вопрос {number}: {" ".join(rng.choices(SYNTHETIC_WORDS, k=12))}?', None])
+        if question_number % 10 == 0:
+            for sub in range(1, 4):
+                numbers.append(f'{number}.{sub}')
+                ws.append([None, None, f'{number}.{sub}. {" ".join(rng.choices(SYNTHETIC_WORDS, k=6))}'])
+    wb.save(excel_path)
+
+    for index in range(1, language_count + 1):
+        parts = []
+        for number in numbers:
+            if rng.random() < 0.1:
+                continue
+            words = rng.choices(SYNTHETIC_WORDS, k=rng.randint(2, 60))
+            words[0] = f'<b>{words[0]}</b>'
+            parts.append(f'{number}. \n<answer>\nДа. {" ".join(words)}.<br />\n</answer>\n')
+        # Language files take a two-digit number, so past 99 the numbers repeat
+        filename = f'{index % 100:02d}-synthetic{index:03d}.html'
+        with open(os.path.join(languages_dir, filename), 'w', encoding='utf-8') as f:
+            f.write(''.join(parts))
+
+    return excel_path, languages_dir
+
+def benchmark_import(excel_path, languages_dir, runs, jobs):
+    """Build the database runs times and report each stage's min and median seconds.
+
+    The build and its questionnaire cache go to a temporary directory that
+    is removed afterwards.
+    """
+    samples = {}
+    directory = tempfile.mkdtemp(prefix='grant-bench-')
+    try:
+        db_path = os.path.join(directory, 'bench.db')
+        for _ in range(runs):
+            timings = {}
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                create_database(db_path, jobs, excel_path, languages_dir, timings,
+                                cache_dir=os.path.join(directory, 'cache'))
+            timings['total'] = time.perf_counter() - started
+            for stage, seconds in timings.items():
+                samples.setdefault(stage, []).append(seconds)
+        size = os.path.getsize(db_path)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    results = {stage: {'min_s': round(min(values), 4), 'median_s': round(statistics.median(values), 4)}
+               for stage, values in samples.items()}
+    for stage, result in results.items():
+        print(f"  {stage:16s} min {result['min_s']:9.4f} s  median {result['median_s']:9.4f} s")
+    results['database_bytes'] = size
+    return results
+
+def compare(before_path, after_path):
+    """Print the relative change of every metric between two result files."""
+    with open(before_path, encoding='utf-8') as f:
+        before = json.load(f)
+    with open(after_path, encoding='utf-8') as f:
+        after = json.load(f)
+    print(f"Comparing {before['meta'].get('commit')} -> {after['meta'].get('commit')}\n")
+
+    print("API (p50 ms, cold / warm):")
+    for name, result in after.get('api', {}).items():
+        old = before.get('api', {}).get(name)
+        if not old:
+            continue
+        changes = []
+        for mode in ('cold', 'warm'):
+            a, b = old[mode]['p50_ms'], result[mode]['p50_ms']
+            changes.append(f"{a:8.2f} -> {b:8.2f} ({(b - a) / a * 100 if a else 0:+6.1f}%)")
+        print(f"  {name:16s} {' | '.join(changes)}")
+
+    for corpus in ('languages', 'synthetic'):
+        old_stages = before.get('importer', {}).get(corpus)
+        new_stages = after.get('importer', {}).get(corpus)
+        if not old_stages or not new_stages:
+            continue
+        print(f"\nImporter, {corpus} corpus (median s):")
+        stages = list(new_stages) + [stage for stage in old_stages if stage not in new_stages]
+        for stage in stages:
+            old, new = old_stages.get(stage), new_stages.get(stage)
+            if not isinstance(old or new, dict):
+                continue
+            if old is None:
+                print(f"  {stage:16s} {'(new)':>9s} -> {new['median_s']:9.4f}")
+            elif new is None:
+                print(f"  {stage:16s} {old['median_s']:9.4f} -> {'(gone)':>9s}")
+            else:
+                a, b = old['median_s'], new['median_s']
+                print(f"  {stage:16s} {a:9.4f} -> {b:9.4f} ({(b - a) / a * 100 if a else 0:+6.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the grant database API and importer')
+    parser.add_argument('--db', default='grant_database.db', help='database served in the API benchmark')
+    parser.add_argument('--requests', '-n', type=int, default=200, help='requests per API scenario (default: 200)')
+    parser.add_argument('--scenario', action='append', help='only run this API scenario (repeatable)')
+    parser.add_argument('--import-runs', type=int, default=3, help='builds per importer corpus (default: 3)')
+    parser.add_argument('--jobs', '-j', type=int, default=None, help='processes used to parse language files')
+    parser.add_argument('--synthetic-languages', type=int, default=200, help='languages in the synthetic corpus')
+    parser.add_argument('--synthetic-questions', type=int, default=5000, help='questions in the synthetic corpus')
+    parser.add_argument('--seed', type=int, default=0, help='seed for the query mix and the synthetic corpus')
+    parser.add_argument('--skip-api', action='store_true', help='skip the API benchmark')
+    parser.add_argument('--skip-import', action='store_true', help='skip the importer benchmark on languages/')
+    parser.add_argument('--skip-synthetic', action='store_true', help='skip the importer benchmark on the synthetic corpus')
+    parser.add_argument('--output', '-o', default='benchmark.json', help='JSON results file (default: benchmark.json)')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'), help='compare two result files and exit')
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = {
+        'meta': {
+            'commit': get_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'args': vars(args)
+        }
+    }
+
+    if not args.skip_api:
+        print(f"[API] {args.requests} requests per scenario against {args.db}")
+        results['api'] = benchmark_api(args.db, args.requests, args.seed, args.scenario)
+
+    results['importer'] = {}
+    if not args.skip_import:
+        print(f"\n[Importer] languages/ corpus, {args.import_runs} run(s)")
+        results['importer']['languages'] = benchmark_import('quest.xlsx', 'languages', args.import_runs, args.jobs)
+
+    if not args.skip_synthetic:
+        print(f"\n[Importer] synthetic corpus: {args.synthetic_languages} languages x "
+              f"{args.synthetic_questions} questions, {args.import_runs} run(s)")
+        directory = tempfile.mkdtemp(prefix='grant-corpus-')
+        try:
+            started = time.perf_counter()
+            excel_path, languages_dir = generate_corpus(
+                directory, args.synthetic_languages, args.synthetic_questions, args.seed)
+            print(f"  Generated in {time.perf_counter() - started:.1f} s")
+            results['importer']['synthetic'] = benchmark_import(excel_path, languages_dir, args.import_runs, args.jobs)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"\n✓ Results written to {args.output}")
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,94 @@
+"""
+Content-Encoding negotiation and compression for API responses.
+
+gzip is always available; brotli is used when the optional ``brotli``
+package is installed. Bodies below a minimum size are sent uncompressed,
+since the framing overhead outweighs the savings.
+"""
+import gzip
+import zlib
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Encodings this process can produce, in order of preference
+SUPPORTED_ENCODINGS = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+# Levels for bodies compressed once and cached, and for per-request bodies.
+# Higher levels gain little on this HTML: gzip -9 is ~8x slower than -6 on a
+# 1.8 MB page for a 7% smaller body.
+STATIC_LEVELS = {'br': 6, 'gzip': 6}
+DYNAMIC_LEVELS = {'br': 4, 'gzip': 4}
+
+def negotiate_encoding(accept_encodings) -> Optional[str]:
+    """Pick the best supported encoding from a parsed Accept-Encoding header.
+
+    Args:
+        accept_encodings: werkzeug Accept object (request.accept_encodings)
+
+    Returns:
+        'br' or 'gzip', or None to send the body uncompressed
+    """
+    best, best_quality = None, 0
+    for encoding in SUPPORTED_ENCODINGS:
+        quality = accept_encodings.quality(encoding)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+def compress(body: bytes, encoding: str, static: bool = False) -> bytes:
+    """Compress a body with the given encoding.
+
+    static=True uses the slower, stronger levels meant for bodies that are
+    compressed once and served many times.
+    """
+    level = (STATIC_LEVELS if static else DYNAMIC_LEVELS)[encoding]
+    if encoding == 'br':
+        return brotli.compress(body, quality=level)
+    # mtime=0 keeps the output deterministic for a given body
+    return gzip.compress(body, compresslevel=level, mtime=0)
+
+def compress_variants(body: bytes, min_size: int) -> Dict[str, bytes]:
+    """Return the identity body plus every supported encoding of it.
+
+    Encodings are skipped for bodies smaller than min_size and whenever
+    they would not make the body smaller.
+    """
+    variants = {'identity': body}
+    if len(body) < min_size:
+        return variants
+    for encoding in SUPPORTED_ENCODINGS:
+        compressed = compress(body, encoding, static=True)
+        if len(compressed) < len(body):
+            variants[encoding] = compressed
+    return variants
+
+class StreamCompressor:
+    """Incrementally compresses a streamed response.
+
+    Every chunk is flushed so clients can decode each batch as it arrives.
+    """
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        level = DYNAMIC_LEVELS[encoding]
+        if encoding == 'br':
+            self._compressor = brotli.Compressor(quality=level)
+        else:
+            # wbits=31 writes a gzip header and trailer around the deflate stream
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes) -> bytes:
+        """Compress one chunk and flush it."""
+        if self.encoding == 'br':
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        """Return the end of the compressed stream."""
+        if self.encoding == 'br':
+            return self._compressor.finish()
+        return self._compressor.flush()
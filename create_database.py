@@ -1,12 +1,71 @@
 import sqlite3
+import math
 import re
+import json
 import openpyxl
 import os
 import glob
-from typing import Dict, List, Tuple
-from bs4 import BeautifulSoup
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+import warnings
+import hashlib
+import uuid
+import argparse
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from bs4 import BeautifulSoup, MarkupResemblesLocatorWarning
 
-def parse_excel_questions_and_groups(excel_path: str) -> Tuple[Dict[str, str], Dict[str, Dict]]:
+from answer_tokenizer import iter_answer_blocks
+
+# Short answers such as "да." look like file names to BeautifulSoup
+warnings.filterwarnings('ignore', category=MarkupResemblesLocatorWarning)
+
+# Question or subquestion number at the start of a cell, e.g. "2.4." or "2.4.1 "
+QUESTION_NUMBER_PATTERN = re.compile(r'^(\d+\.\d+(?:\.\d+)*)[.\s]')
+
+# Group header cell, e.g. "1. Границы клауз..."
+GROUP_HEADER_PATTERN = re.compile(r'^(\d+)\.\s*(.+)$')
+
+# Parsed questionnaires, keyed by the SHA-256 of quest.xlsx
+QUESTIONNAIRE_CACHE_DIR = '.cache'
+
+def iter_questionnaire(excel_path: str) -> Iterator[Tuple[str, str, str, Optional[str]]]:
+    """Stream group headers, questions and subquestions from quest.xlsx in one pass.
+    
+    The workbook is opened in read-only mode and only the first three columns
+    are read: column 1 holds group headers, column 2 main questions and
+    column 3 subquestions.
+    
+    Yields:
+        (kind, number, text, group_number) tuples where kind is 'group',
+        'question' or 'subquestion'. group_number is the group a question
+        belongs to (None before the first group header); for groups it is
+        the group's own number and text is the group name.
+    """
+    wb = openpyxl.load_workbook(excel_path, read_only=True)
+    try:
+        ws = wb.active
+        current_group_num = None
+        
+        for row in ws.iter_rows(min_col=1, max_col=3, values_only=True):
+            group_cell, question_cell, subquestion_cell = (tuple(row) + (None, None, None))[:3]
+            
+            if group_cell and isinstance(group_cell, str):
+                match = GROUP_HEADER_PATTERN.match(group_cell.strip())
+                if match:
+                    current_group_num = match.group(1)
+                    yield 'group', current_group_num, match.group(2).strip(), current_group_num
+            
+            for kind, cell in (('question', question_cell), ('subquestion', subquestion_cell)):
+                if cell and isinstance(cell, str):
+                    text = cell.strip()
+                    match = QUESTION_NUMBER_PATTERN.match(text)
+                    if match:
+                        yield kind, match.group(1), text, current_group_num
+    finally:
+        wb.close()
+
+def parse_questionnaire(excel_path: str) -> Tuple[Dict[str, str], Dict[str, Dict]]:
     """Parse quest.xlsx and extract questions and group information.
     
     Returns:
@@ -14,88 +73,61 @@ def parse_excel_questions_and_groups(excel_path: str) -> Tuple[Dict[str, str], D
         - questions_dict: Maps question numbers to their full question text
         - groups_dict: Maps group numbers to {'name': str, 'question_numbers': list}
     """
-    wb = openpyxl.load_workbook(excel_path)
-    ws = wb.active
-    
     questions = {}
     groups = {}
-    current_group_num = None
-    
-    for row in range(1, ws.max_row + 1):
-        # Check column 1 (group headers)
-        group_cell = ws.cell(row, 1).value
-        if group_cell and isinstance(group_cell, str):
-            # Extract group number and name (e.g., "1. Границы клауз...")
-            match = re.match(r'^(\d+)\.\s*(.+)$', group_cell.strip())
-            if match:
-                group_num = match.group(1)
-                group_name = match.group(2).strip()
-                current_group_num = group_num
-                groups[group_num] = {
-                    'name': group_name,
-                    'question_numbers': []
-                }
-        
-        # Check column 2 (main questions)
-        question_cell = ws.cell(row, 2).value
-        if question_cell and isinstance(question_cell, str):
-            question_text = question_cell.strip()
-            match = re.match(r'^(\d+\.\d+(?:\.\d+)*)[.\s]', question_text)
-            if match:
-                question_num = match.group(1)
-                questions[question_num] = question_text
-                # Associate question with current group
-                if current_group_num and current_group_num in groups:
-                    groups[current_group_num]['question_numbers'].append(question_num)
+    
+    for kind, number, text, group_num in iter_questionnaire(excel_path):
+        if kind == 'group':
+            groups[number] = {
+                'name': text,
+                'question_numbers': []
+            }
+            continue
         
-        # Check column 3 (subquestions)
-        subquestion_cell = ws.cell(row, 3).value
-        if subquestion_cell and isinstance(subquestion_cell, str):
-            subquestion_text = subquestion_cell.strip()
-            match = re.match(r'^(\d+\.\d+(?:\.\d+)*)[.\s]', subquestion_text)
-            if match:
-                subquestion_num = match.group(1)
-                questions[subquestion_num] = subquestion_text
-                # Associate subquestion with current group
-                if current_group_num and current_group_num in groups:
-                    groups[current_group_num]['question_numbers'].append(subquestion_num)
-    
-    wb.close()
+        questions[number] = text
+        # Associate question with current group
+        if group_num and group_num in groups:
+            groups[group_num]['question_numbers'].append(number)
+    
     return questions, groups
 
-def parse_excel_questions(excel_path: str) -> Dict[str, str]:
-    """Parse quest.xlsx and extract all questions with their numbers and full text.
+def load_questionnaire(excel_path: str, cache_dir: str = QUESTIONNAIRE_CACHE_DIR) -> Tuple[Dict[str, str], Dict[str, Dict], bool]:
+    """Parse quest.xlsx, reusing a cached result if the file is unchanged.
+    
+    Writing a new result removes the cached results of older versions.
     
-    Returns a dictionary mapping question numbers to their full question text.
+    Returns:
+        Tuple of (questions_dict, groups_dict, from_cache) as for parse_questionnaire()
     """
-    wb = openpyxl.load_workbook(excel_path)
-    ws = wb.active
+    cache_path = os.path.join(cache_dir, f'questionnaire-{file_sha256(excel_path)}.json')
     
-    questions = {}
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as f:
+            cached = json.load(f)
+        return cached['questions'], cached['groups'], True
+    except (OSError, ValueError, KeyError):
+        pass
     
-    for row in range(1, ws.max_row + 1):
-        # Check column 2 (main questions)
-        question_cell = ws.cell(row, 2).value
-        if question_cell and isinstance(question_cell, str):
-            question_text = question_cell.strip()
-            # Extract question number (e.g., "1.1.", "2.4.")
-            match = re.match(r'^(\d+\.\d+(?:\.\d+)*)[.\s]', question_text)
-            if match:
-                question_num = match.group(1)
-                questions[question_num] = question_text
-        
-        # Check column 3 (subquestions)
-        subquestion_cell = ws.cell(row, 3).value
-        if subquestion_cell and isinstance(subquestion_cell, str):
-            subquestion_text = subquestion_cell.strip()
-            # Extract subquestion number (e.g., "2.4.1.", "2.12.")
-            match = re.match(r'^(\d+\.\d+(?:\.\d+)*)[.\s]', subquestion_text)
-            if match:
-                subquestion_num = match.group(1)
-                questions[subquestion_num] = subquestion_text
-    
-    wb.close()
-    return questions
+    questions, groups = parse_questionnaire(excel_path)
+    
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp_path = f'{cache_path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'questions': questions, 'groups': groups}, f, ensure_ascii=False)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        print(f"  ⚠ Could not cache parsed questionnaire: {e}")
+    
+    # Only the current questionnaire is worth keeping
+    for stale_path in glob.glob(os.path.join(cache_dir, 'questionnaire-*.json')):
+        if stale_path != cache_path:
+            try:
+                os.remove(stale_path)
+            except OSError:
+                pass
+    
+    return questions, groups, False
 
 def normalize_question_text(text: str) -> str:
     """Normalize question text for matching: remove extra spaces, normalize whitespace."""
@@ -103,49 +135,85 @@ def normalize_question_text(text: str) -> str:
     text = re.sub(r'[\s]+', ' ', text)
     return text.strip()
 
-def parse_language_file(filename: str, questions: Dict[str, str]) -> Dict[str, str]:
+def parse_language_file(filename: str, questions: Dict[str, str],
+                        issues: Optional[List[Tuple[int, str]]] = None) -> Dict[str, str]:
     """Parse a language HTML file with <answer></answer> tags containing HTML content.
     
+    The file is streamed once through answer_tokenizer, which detects its
+    encoding and reads each "<number> <answer>...</answer>" block.
+    
     Args:
         filename: Path to the language HTML file in languages/ folder
         questions: Dictionary of question numbers to question texts from Excel
+        issues: Optional list that receives (line, message) tuples for
+            malformed blocks, duplicate answers and unknown question numbers
     
     Returns:
         Dictionary mapping question numbers to HTML answer texts (unchanged from file)
     """
-    # Try different encodings
-    encodings = ['utf-8', 'utf-16', 'cp1251', 'latin-1']
-    content = None
+    if issues is None:
+        issues = []
+    answers = {}
+    answer_lines = {}
     
-    for encoding in encodings:
-        try:
-            with open(filename, 'r', encoding=encoding) as f:
-                content = f.read()
-            break
-        except (UnicodeDecodeError, UnicodeError):
+    for block in iter_answer_blocks(filename, issues):
+        # Only process if this question number is in our questions dict
+        if block.number not in questions:
+            issues.append((block.line, f'answer for {block.number}, which is not in the questionnaire; skipped'))
             continue
+        
+        if block.number in answer_lines:
+            issues.append((block.line, f'second answer for {block.number} (first at line '
+                                       f'{answer_lines[block.number]}); it replaces the first'))
+        answer_lines[block.number] = block.line
+        
+        # Store the HTML content as-is (no conversion needed)
+        answers[block.number] = block.html
     
-    if content is None:
-        raise ValueError(f"Could not decode file {filename} with any known encoding")
+    issues.sort()
+    return answers
+
+def _parse_language_job(job: Tuple[str, Dict[str, str]]) -> Tuple[Dict[str, str], str, List[Tuple[int, str]]]:
+    """Process-pool worker: parse one language file, returning (answers, error, issues)."""
+    filepath, questions = job
+    issues = []
+    try:
+        return parse_language_file(filepath, questions, issues), None, issues
+    except Exception as e:
+        return {}, str(e), issues
+
+def parse_language_files(language_files: List[Tuple[str, str, str]], questions: Dict[str, str],
+                         jobs: int = None) -> List[Tuple[Dict[str, str], str, List[Tuple[int, str]]]]:
+    """Parse several language files, in parallel when jobs > 1.
     
-    answers = {}
+    Args:
+        language_files: (file_path, language_name, number) tuples as from discover_language_files()
+        questions: Dictionary of question numbers to question texts from Excel
+        jobs: Number of worker processes (default: CPU count; 1 parses in-process)
     
-    # Find all <answer>...</answer> blocks
-    # Pattern: question_number followed by <answer>content</answer>
-    pattern = r'(\d+(?:\.\d+)*)[.\s\t]*<answer>(.*?)</answer>'
+    Returns:
+        One (answers, error, issues) tuple per file, in the order of
+        language_files; error is None on success and issues lists the
+        (line, message) problems found in the file
+    """
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = max(1, min(jobs, len(language_files)))
+    work = [(filepath, questions) for filepath, _, _ in language_files]
     
-    for match in re.finditer(pattern, content, re.DOTALL | re.IGNORECASE):
-        question_num = match.group(1)
-        answer_html = match.group(2).strip()
-        
-        # Only process if this question number is in our questions dict
-        if question_num in questions:
-            # Store the HTML content as-is (no conversion needed)
-            answers[question_num] = answer_html
+    if jobs == 1:
+        return [_parse_language_job(job) for job in work]
     
-    return answers
+    # map() yields results in submission order, so the merge is deterministic
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(_parse_language_job, work))
+
+def print_parse_issues(filepath: str, issues: List[Tuple[int, str]]):
+    """Print the problems parse_language_file() found in a file."""
+    for line, message in issues:
+        print(f"    ⚠ {os.path.basename(filepath)}:{line}: {message}")
 
-def discover_language_files() -> List[Tuple[str, str, str]]:
+def discover_language_files(languages_dir: str = 'languages') -> List[Tuple[str, str, str]]:
     """Discover all language HTML files in the languages/ folder.
     
     Returns:
@@ -155,7 +223,7 @@ def discover_language_files() -> List[Tuple[str, str, str]]:
     language_files = []
     
     # Find all numbered HTML files in languages/ folder
-    pattern = os.path.join('languages', '[0-9][0-9]-*.html')
+    pattern = os.path.join(languages_dir, '[0-9][0-9]-*.html')
     files = glob.glob(pattern)
     
     for filepath in files:
@@ -271,52 +339,557 @@ def merge_subquestions(language_data: Dict[str, str], quest_data: Dict[str, str]
     
     return merged
 
+def question_sort_key(question_number: str) -> str:
+    """Sortable key for a question number: every component zero-padded to 4 digits.
+    
+    Example: "2.4.1" -> "0002.0004.0001", which sorts after "0002.0004" and
+    before "0002.0010".
+    """
+    return '.'.join([part.zfill(4) for part in question_number.split('.')])
+
 def get_group_number(question_number: str) -> str:
     """Extract the top-level group number from a question number."""
     return question_number.split('.')[0]
 
-def create_database(db_path: str):
-    """Create SQLite database with questionnaire data."""
+def answer_to_text(answer_html: str) -> str:
+    """Plain-text rendition of an HTML answer: tags stripped, entities decoded, whitespace collapsed."""
+    return normalize_question_text(BeautifulSoup(answer_html, 'html.parser').get_text(' '))
+
+def create_language_tables(cursor):
+    """Create the long-format languages and answers tables.
+    
+    Unlike the per-language columns of the questions table, these need no
+    schema change when a language is added, and let queries fetch just the
+    languages they need.
+    """
+    cursor.execute('''
+        CREATE TABLE languages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE NOT NULL,
+            number TEXT NOT NULL,
+            source_file TEXT NOT NULL,
+            position INTEGER NOT NULL
+        )
+    ''')
+    
+    # The primary key covers lookups by question; idx_answers_language (see
+    # create_indexes) covers per-language scans without touching the HTML
+    cursor.execute('''
+        CREATE TABLE answers (
+            question_id INTEGER NOT NULL,
+            language_id INTEGER NOT NULL,
+            html TEXT NOT NULL,
+            text TEXT NOT NULL,
+            length INTEGER NOT NULL,
+            PRIMARY KEY (question_id, language_id),
+            FOREIGN KEY (question_id) REFERENCES questions(id),
+            FOREIGN KEY (language_id) REFERENCES languages(id)
+        ) WITHOUT ROWID
+    ''')
+
+def create_indexes(cursor):
+    """Create the secondary indexes of the questions and answers tables.
+    
+    A full build creates them after the bulk load: one sorted pass per index
+    is much cheaper than updating every index on every inserted row.
+    """
+    # (group_id, sort_key) serves ordered group listings straight from the index
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_group_id ON questions(group_id)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_questions_group_sort ON questions(group_id, sort_key)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_questions_sort ON questions(sort_key)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_answers_language ON answers(language_id, question_id, length)')
+
+def insert_language_answers(cursor, language_id: int, answers: Dict[str, str],
+                            question_ids: Dict[str, int]) -> int:
+    """Insert one language's non-empty answers into the answers table.
+    
+    Returns:
+        Number of inserted answers
+    """
+    def rows():
+        for question_num, answer_html in answers.items():
+            if not answer_html or question_num not in question_ids:
+                continue
+            text = answer_to_text(answer_html)
+            yield question_ids[question_num], language_id, answer_html, text, len(text)
+    
+    cursor.executemany('''
+        INSERT INTO answers (question_id, language_id, html, text, length)
+        VALUES (?, ?, ?, ?, ?)
+    ''', rows())
+    return cursor.rowcount
+
+def file_sha256(path: str) -> str:
+    """SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def create_source_files_table(cursor):
+    """Create the table recording the content hash of every imported source file."""
+    cursor.execute('''
+        CREATE TABLE source_files (
+            path TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            language TEXT,
+            sha256 TEXT NOT NULL,
+            imported_at TEXT NOT NULL
+        )
+    ''')
+
+def record_source_file(cursor, path: str, kind: str, lang_name, sha256: str = None):
+    """Insert or update the hash of an imported source file."""
+    cursor.execute('''
+        INSERT INTO source_files (path, kind, language, sha256, imported_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(path) DO UPDATE SET
+            kind = excluded.kind,
+            language = excluded.language,
+            sha256 = excluded.sha256,
+            imported_at = excluded.imported_at
+    ''', (path.replace(os.sep, '/'), kind, lang_name, sha256 or file_sha256(path),
+          datetime.now(timezone.utc).isoformat(timespec='seconds')))
+
+def import_language(cursor, filepath: str, lang_name: str, number: str, answers: Dict[str, str]) -> int:
+    """Add or replace one language in an existing database.
+    
+    Updates the language column of the questions table (adding it if needed),
+    the languages and answers tables and the search index. The caller owns
+    the transaction and refreshes the statistics afterwards.
+    
+    Returns:
+        Number of non-empty answers imported
+    """
+    cursor.execute('PRAGMA table_info(questions)')
+    if lang_name not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f'ALTER TABLE questions ADD COLUMN {lang_name} TEXT')
+    
+    cursor.execute('SELECT question_number, id FROM questions')
+    question_ids = dict(cursor.fetchall())
+    cursor.executemany(f'UPDATE questions SET {lang_name} = ? WHERE id = ?', [
+        (answers.get(question_num, ''), question_id)
+        for question_num, question_id in question_ids.items()
+    ])
+    
+    cursor.execute('SELECT id FROM languages WHERE name = ?', (lang_name,))
+    row = cursor.fetchone()
+    if row:
+        language_id = row[0]
+        cursor.execute('''
+            UPDATE languages SET number = ?, source_file = ? WHERE id = ?
+        ''', (number, os.path.basename(filepath), language_id))
+        cursor.execute('DELETE FROM answers WHERE language_id = ?', (language_id,))
+    else:
+        cursor.execute('SELECT COALESCE(MAX(position) + 1, 0) FROM languages')
+        position = cursor.fetchone()[0]
+        cursor.execute('''
+            INSERT INTO languages (name, number, source_file, position)
+            VALUES (?, ?, ?, ?)
+        ''', (lang_name, number, os.path.basename(filepath), position))
+        language_id = cursor.lastrowid
+    
+    answer_count = insert_language_answers(cursor, language_id, answers, question_ids)
+    index_language(cursor, lang_name)
+    return answer_count
+
+def index_language(cursor, lang_name: str):
+    """(Re)index one language's plain-text answers in the search index.
+    
+    The index holds answers.text rather than the HTML, so tag names and
+    attributes never match a search and snippets contain no broken markup.
+    """
+    cursor.execute('DELETE FROM search_index WHERE language = ?', (lang_name,))
+    cursor.execute('''
+        INSERT INTO search_index (question_id, language, content)
+        SELECT a.question_id, l.name, a.text
+        FROM answers a
+        JOIN languages l ON a.language_id = l.id
+        WHERE l.name = ? AND a.text != ''
+    ''', (lang_name,))
+
+def build_search_index(cursor, language_names: List[str]) -> int:
+    """Build the FTS5 index behind /api/search.
+    
+    The index holds one document per question per language (plus one for the
+    question text itself), so a search is a single index lookup no matter how
+    many language columns the questions table has.
+    
+    Returns:
+        Number of indexed documents
+    """
+    cursor.execute('DROP TABLE IF EXISTS search_index')
+    cursor.execute('''
+        CREATE VIRTUAL TABLE search_index USING fts5(
+            question_id UNINDEXED,
+            language UNINDEXED,
+            content,
+            tokenize = 'unicode61',
+            prefix = '2 3'
+        )
+    ''')
+    
+    cursor.execute('''
+        INSERT INTO search_index (question_id, language, content)
+        SELECT id, 'question_text', question_text FROM questions
+    ''')
+    
+    # One pass over every language; index_language() would first scan the
+    # whole (UNINDEXED) language column to delete, once per language
+    cursor.execute(f'''
+        INSERT INTO search_index (question_id, language, content)
+        SELECT a.question_id, l.name, a.text
+        FROM answers a
+        JOIN languages l ON a.language_id = l.id
+        WHERE l.name IN ({', '.join(['?'] * len(language_names))}) AND a.text != ''
+        ORDER BY l.position, a.question_id
+    ''', language_names)
+    
+    # Merge the b-tree segments written above into one
+    cursor.execute("INSERT INTO search_index (search_index) VALUES ('optimize')")
+    
+    cursor.execute('SELECT COUNT(*) FROM search_index')
+    return cursor.fetchone()[0]
+
+def record_build_info(cursor) -> str:
+    """Stamp the database with a new build id and build time.
+    
+    The API derives its dataset version (ETags, cache invalidation) from the
+    build id, so every full build or incremental update gets a fresh one.
+    
+    Returns:
+        The new build id
+    """
+    cursor.execute('DROP TABLE IF EXISTS build_info')
+    cursor.execute('''
+        CREATE TABLE build_info (
+            build_id TEXT NOT NULL,
+            built_at TEXT NOT NULL
+        )
+    ''')
+    build_id = uuid.uuid4().hex
+    cursor.execute('''
+        INSERT INTO build_info (build_id, built_at) VALUES (?, ?)
+    ''', (build_id, datetime.now(timezone.utc).isoformat(timespec='seconds')))
+    return build_id
+
+def percentile(sorted_values: List[int], pct: float) -> int:
+    """Nearest-rank percentile of an already sorted list (0 for an empty list)."""
+    if not sorted_values:
+        return 0
+    rank = math.ceil(pct / 100 * len(sorted_values))
+    return sorted_values[max(rank, 1) - 1]
+
+def build_statistics(cursor, language_names: List[str]):
+    """Materialize the statistics served by /api/stats.
+    
+    Creates:
+        - stats: scalar totals (questions, groups, languages, complete responses)
+        - group_stats: question count per group
+        - language_coverage: answer count and plain-text answer-length percentiles per language
+        - question_coverage: per-question answer count and a completeness bitmap
+          with one '0'/'1' character per language in language_coverage.position order
+    """
+    for table in ('stats', 'group_stats', 'language_coverage', 'question_coverage'):
+        cursor.execute(f'DROP TABLE IF EXISTS {table}')
+    
+    cursor.execute('''
+        CREATE TABLE stats (
+            key TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE group_stats (
+            group_number TEXT PRIMARY KEY,
+            group_name TEXT NOT NULL,
+            question_count INTEGER NOT NULL,
+            position INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE language_coverage (
+            language TEXT PRIMARY KEY,
+            position INTEGER NOT NULL,
+            answered INTEGER NOT NULL,
+            total INTEGER NOT NULL,
+            percentage REAL NOT NULL,
+            length_min INTEGER NOT NULL,
+            length_p50 INTEGER NOT NULL,
+            length_p90 INTEGER NOT NULL,
+            length_p99 INTEGER NOT NULL,
+            length_max INTEGER NOT NULL
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE question_coverage (
+            question_id INTEGER PRIMARY KEY,
+            answered INTEGER NOT NULL,
+            complete INTEGER NOT NULL,
+            bitmap TEXT NOT NULL,
+            FOREIGN KEY (question_id) REFERENCES questions(id)
+        )
+    ''')
+    
+    # Plain-text answer lengths per question and language; a question is
+    # answered in a language if it has an answers row
+    cursor.execute('SELECT id FROM questions ORDER BY id')
+    question_ids = [row[0] for row in cursor.fetchall()]
+    total = len(question_ids)
+    
+    position_of = {lang_name: position for position, lang_name in enumerate(language_names)}
+    answered_by_question = {question_id: ['0'] * len(language_names) for question_id in question_ids}
+    lengths_by_language = [[] for _ in language_names]
+    cursor.execute('''
+        SELECT a.question_id, l.name, a.length
+        FROM answers a
+        JOIN languages l ON a.language_id = l.id
+    ''')
+    for question_id, lang_name, length in cursor.fetchall():
+        position = position_of.get(lang_name)
+        if position is None:
+            continue
+        answered_by_question[question_id][position] = '1'
+        lengths_by_language[position].append(length)
+    
+    question_rows = []
+    complete_count = 0
+    for question_id in question_ids:
+        bitmap = ''.join(answered_by_question[question_id])
+        answered = bitmap.count('1')
+        complete = 1 if language_names and answered == len(language_names) else 0
+        complete_count += complete
+        question_rows.append((question_id, answered, complete, bitmap))
+    
+    cursor.executemany('''
+        INSERT INTO question_coverage (question_id, answered, complete, bitmap)
+        VALUES (?, ?, ?, ?)
+    ''', question_rows)
+    
+    coverage_rows = []
+    for position, (lang_name, lengths) in enumerate(zip(language_names, lengths_by_language)):
+        lengths.sort()
+        answered = len(lengths)
+        percentage = round(answered / total * 100, 1) if total > 0 else 0.0
+        coverage_rows.append((
+            lang_name, position, answered, total, percentage,
+            lengths[0] if lengths else 0,
+            percentile(lengths, 50), percentile(lengths, 90), percentile(lengths, 99),
+            lengths[-1] if lengths else 0
+        ))
+    cursor.executemany('''
+        INSERT INTO language_coverage
+        (language, position, answered, total, percentage,
+         length_min, length_p50, length_p90, length_p99, length_max)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', coverage_rows)
+    
+    cursor.execute('''
+        INSERT INTO group_stats (group_number, group_name, question_count, position)
+        SELECT g.group_number, g.group_name, COUNT(q.id),
+               ROW_NUMBER() OVER (ORDER BY CAST(g.group_number AS INTEGER))
+        FROM groups g
+        LEFT JOIN questions q ON g.id = q.group_id
+        GROUP BY g.id
+    ''')
+    
+    cursor.execute('SELECT COUNT(*) FROM groups')
+    total_groups = cursor.fetchone()[0]
+    cursor.executemany('INSERT INTO stats (key, value) VALUES (?, ?)', [
+        ('total_questions', total),
+        ('total_groups', total_groups),
+        ('language_count', len(language_names)),
+        ('complete_responses', complete_count)
+    ])
+
+def build_path_for(db_path: str) -> str:
+    """Temporary file next to db_path that a new build is written to."""
+    directory, filename = os.path.split(os.path.abspath(db_path))
+    return os.path.join(directory, f'.{filename}.build-{os.getpid()}')
+
+def discard_build(build_path: str):
+    """Remove a temporary build file and any journal it left behind."""
+    for path in (build_path, build_path + '-journal'):
+        if os.path.exists(path):
+            os.remove(path)
+
+def check_database(db_path: str):
+    """Run integrity and coverage checks on a freshly built database.
+    
+    Raises:
+        ValueError: describing the first failed check
+    """
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    try:
+        cursor.execute('PRAGMA integrity_check')
+        result = cursor.fetchone()[0]
+        if result != 'ok':
+            raise ValueError(f"integrity check failed: {result}")
+        
+        cursor.execute('PRAGMA foreign_key_check')
+        if cursor.fetchone() is not None:
+            raise ValueError("foreign key check failed")
+        
+        try:
+            cursor.execute("INSERT INTO search_index (search_index) VALUES ('integrity-check')")
+        except sqlite3.DatabaseError as e:
+            raise ValueError(f"search index check failed: {e}")
+        
+        cursor.execute('SELECT COUNT(*) FROM questions')
+        total = cursor.fetchone()[0]
+        if total == 0:
+            raise ValueError("database contains no questions")
+        
+        cursor.execute('SELECT COUNT(*) FROM build_info')
+        if cursor.fetchone()[0] != 1:
+            raise ValueError("build_info must hold exactly one build id")
+        
+        cursor.execute("SELECT value FROM stats WHERE key = 'total_questions'")
+        row = cursor.fetchone()
+        if row is None or row[0] != total:
+            raise ValueError("stats table is out of date")
+        
+        # Every language must have answers, and the precomputed coverage must
+        # match the answers actually stored
+        cursor.execute('''
+            SELECT l.name, COUNT(a.question_id), c.answered
+            FROM languages l
+            LEFT JOIN answers a ON a.language_id = l.id
+            LEFT JOIN language_coverage c ON c.language = l.name
+            GROUP BY l.id
+        ''')
+        for lang_name, answer_count, answered in cursor.fetchall():
+            if answer_count == 0:
+                raise ValueError(f"language {lang_name} has no answers")
+            if answered != answer_count:
+                raise ValueError(f"coverage for {lang_name} is out of date")
+    finally:
+        conn.close()
+
+def publish_database(build_path: str, db_path: str):
+    """Check a finished build and atomically swap it in as db_path.
+    
+    os.replace() is atomic, so readers either keep the old file open or open
+    the new one; there is never a moment without a complete database.
+    """
+    check_database(build_path)
+    os.replace(build_path, db_path)
+
+class StageTimer:
+    """Records the wall-clock duration of consecutive build stages."""
+    
+    def __init__(self, timings: Dict[str, float] = None):
+        self.timings = timings if timings is not None else {}
+        self._started = time.perf_counter()
+    
+    def lap(self, stage: str):
+        """Record the time since the previous lap (or creation) under stage."""
+        now = time.perf_counter()
+        self.timings[stage] = now - self._started
+        self._started = now
+
+def print_timings(timings: Dict[str, float]):
+    """Print the seconds spent in each build stage."""
+    print("\nStage timings:")
+    for stage, seconds in timings.items():
+        print(f"  {stage:20s} {seconds:8.2f}s")
+    print(f"  {'total':20s} {sum(timings.values()):8.2f}s")
+
+def create_database(db_path: str, jobs: int = None, excel_path: str = 'quest.xlsx',
+                    languages_dir: str = 'languages', timings: Dict[str, float] = None,
+                    cache_dir: str = QUESTIONNAIRE_CACHE_DIR):
+    """Create SQLite database with questionnaire data.
+    
+    The database is built in a temporary file next to db_path, checked, and
+    then atomically swapped in, so the API never sees a missing or half-built
+    database. If timings is given, the seconds spent in each stage are
+    stored in it.
+    """
+    timings = {} if timings is None else timings
+    build_path = build_path_for(db_path)
+    discard_build(build_path)
+    try:
+        if build_database(build_path, jobs, excel_path, languages_dir, timings, cache_dir):
+            print("\nPublishing database...")
+            timer = StageTimer(timings)
+            publish_database(build_path, db_path)
+            timer.lap('publish')
+            print(f"  ✓ Checked and swapped in {db_path}")
+            print_timings(timings)
+    finally:
+        discard_build(build_path)
+
+def build_database(db_path: str, jobs: int = None, excel_path: str = 'quest.xlsx',
+                   languages_dir: str = 'languages', timings: Dict[str, float] = None,
+                   cache_dir: str = QUESTIONNAIRE_CACHE_DIR) -> bool:
+    """Build the complete database at db_path.
+    
+    Args:
+        db_path: Path of the database file to create
+        jobs: Number of processes used to parse language files
+        excel_path: Questionnaire workbook
+        languages_dir: Folder holding the XX-languagename.html files
+        timings: Optional dict that receives the seconds spent in each stage
+        cache_dir: Folder for the cached parse of the questionnaire
+    
+    Returns:
+        False if there was nothing to build (no language files)
+    """
+    timer = StageTimer(timings)
     
     print("=" * 70)
     print("CREATING GRANT DATABASE")
     print("=" * 70)
     
-    print("\n[1/5] Parsing Excel file for questions and groups...")
-    quest_data, groups_data = parse_excel_questions_and_groups('quest.xlsx')
+    print("\n[1/8] Parsing Excel file for questions and groups...")
+    quest_data, groups_data, from_cache = load_questionnaire(excel_path, cache_dir)
+    if from_cache:
+        print("  ✓ quest.xlsx unchanged, using cached parse")
     print(f"  ✓ Found {len(quest_data)} questions in quest.xlsx")
     print(f"  ✓ Found {len(groups_data)} groups in quest.xlsx")
+    timer.lap('questionnaire')
     
-    print("\n[2/5] Discovering language files...")
-    language_files = discover_language_files()
+    print("\n[2/8] Discovering language files...")
+    language_files = discover_language_files(languages_dir)
     
     if not language_files:
         print("  ⚠ WARNING: No language files found in languages/ folder")
         print("  Expected pattern: XX-languagename.html (e.g., 01-russian.html)")
-        return
+        return False
     
     print(f"  ✓ Found {len(language_files)} language files:")
     for filepath, lang_name, number in language_files:
         print(f"    {number}. {lang_name} ({os.path.basename(filepath)})")
+    timer.lap('discover')
     
-    print("\n[3/5] Parsing language files...")
+    print("\n[3/8] Parsing language files...")
     language_data = {}
-    for filepath, lang_name, number in language_files:
-        try:
-            data = parse_language_file(filepath, quest_data)
+    for (filepath, lang_name, _), (data, error, issues) in zip(language_files, parse_language_files(language_files, quest_data, jobs)):
+        if error is None:
             language_data[lang_name] = data
             print(f"  ✓ {lang_name}: {len(data)} answers")
-        except Exception as e:
-            print(f"  ✗ {lang_name}: ERROR - {e}")
+        else:
+            print(f"  ✗ {lang_name}: ERROR - {error}")
             language_data[lang_name] = {}
+        print_parse_issues(filepath, issues)
+    timer.lap('parse_languages')
     
-    print("\n[4/5] Creating database structure...")
+    print("\n[4/8] Creating database structure...")
     
-    # Create database
+    # Create database. The build file stays private until publish_database()
+    # checks it and swaps it in, so a crash can only lose a build that would be
+    # discarded anyway: skip the rollback journal and fsyncs while loading
     conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA journal_mode = OFF')
+    conn.execute('PRAGMA synchronous = OFF')
     cursor = conn.cursor()
     
     # Drop existing tables to ensure clean slate
+    cursor.execute('DROP TABLE IF EXISTS source_files')
+    cursor.execute('DROP TABLE IF EXISTS answers')
+    cursor.execute('DROP TABLE IF EXISTS languages')
     cursor.execute('DROP TABLE IF EXISTS questions')
     cursor.execute('DROP TABLE IF EXISTS groups')
     
@@ -338,6 +911,7 @@ def create_database(db_path: str):
             question_number TEXT UNIQUE NOT NULL,
             group_id INTEGER NOT NULL,
             question_text TEXT NOT NULL,
+            sort_key TEXT NOT NULL,
             {language_columns},
             FOREIGN KEY (group_id) REFERENCES groups(id)
         )
@@ -345,87 +919,127 @@ def create_database(db_path: str):
     
     cursor.execute(create_questions_table)
     
-    # Create indexes for faster queries
-    cursor.execute('''
-        CREATE INDEX IF NOT EXISTS idx_group_id ON questions(group_id)
-    ''')
+    create_language_tables(cursor)
     
     print(f"  ✓ Created tables with {len(language_files)} language columns")
+    timer.lap('create_tables')
     
     # Insert groups
-    print("\n[5/5] Inserting data into database...")
-    group_id_map = {}  # Map group_number to database id
-    for group_num in sorted(groups_data.keys(), key=lambda x: int(x)):
-        group_info = groups_data[group_num]
-        cursor.execute('''
-            INSERT INTO groups (group_number, group_name)
-            VALUES (?, ?)
-        ''', (group_num, group_info['name']))
-        group_id_map[group_num] = cursor.lastrowid
+    print("\n[5/8] Inserting data into database...")
+    cursor.executemany('''
+        INSERT INTO groups (group_number, group_name)
+        VALUES (?, ?)
+    ''', ((group_num, groups_data[group_num]['name'])
+          for group_num in sorted(groups_data.keys(), key=lambda x: int(x))))
+    cursor.execute('SELECT group_number, id FROM groups')
+    group_id_map = dict(cursor.fetchall())  # Map group_number to database id
     
     print(f"  ✓ Inserted {len(groups_data)} groups")
     
-    # Insert questions with dynamic language data
-    inserted_count = 0
-    for question_num, question_text in quest_data.items():
-        group_num = get_group_number(question_num)
-        
-        # Get group_id from the map
-        group_id = group_id_map.get(group_num)
-        if not group_id:
-            print(f"    Warning: No group found for question {question_num}")
-            continue
-        
-        # Build dynamic values list
-        values = [question_num, group_id, question_text]
-        
-        # Add language data in the same order as columns
-        for _, lang_name, _ in language_files:
-            lang_answers = language_data.get(lang_name, {})
-            values.append(lang_answers.get(question_num, ''))
-        
-        # Build dynamic INSERT statement
-        placeholders = ', '.join(['?'] * len(values))
-        language_col_names = ', '.join([lang_name for _, lang_name, _ in language_files])
-        
-        insert_sql = f'''
-            INSERT INTO questions 
-            (question_number, group_id, question_text, {language_col_names})
-            VALUES ({placeholders})
-        '''
-        
-        try:
-            cursor.execute(insert_sql, values)
-            inserted_count += 1
-        except sqlite3.IntegrityError as e:
-            print(f"    ERROR: Duplicate question number: {question_num}")
-            print(f"    Text: {question_text[:100]}")
-            raise
+    # Insert questions with dynamic language data: one statement, prepared
+    # once, fed one row at a time by a generator
+    lang_names = [lang_name for _, lang_name, _ in language_files]
+    lang_answers = [language_data.get(lang_name, {}) for lang_name in lang_names]
     
-    conn.commit()
+    def question_rows():
+        for question_num, question_text in quest_data.items():
+            group_id = group_id_map.get(get_group_number(question_num))
+            if not group_id:
+                print(f"    Warning: No group found for question {question_num}")
+                continue
+            yield (question_num, group_id, question_text, question_sort_key(question_num),
+                   *(answers.get(question_num, '') for answers in lang_answers))
     
-    print(f"  ✓ Inserted {inserted_count} questions")
+    insert_sql = f'''
+        INSERT INTO questions
+        (question_number, group_id, question_text, sort_key, {', '.join(lang_names)})
+        VALUES ({', '.join(['?'] * (4 + len(lang_names)))})
+    '''
+    try:
+        cursor.executemany(insert_sql, question_rows())
+    except sqlite3.IntegrityError as e:
+        print(f"    ERROR: Could not insert questions: {e}")
+        raise
     
-    # Print statistics
-    cursor.execute('SELECT COUNT(*) FROM questions')
-    total_count = cursor.fetchone()[0]
+    print(f"  ✓ Inserted {cursor.rowcount} questions")
     
-    cursor.execute('SELECT COUNT(*) FROM groups')
-    group_count = cursor.fetchone()[0]
+    # Long-format copy of the answers: one row per answered question per language
+    cursor.executemany('''
+        INSERT INTO languages (name, number, source_file, position)
+        VALUES (?, ?, ?, ?)
+    ''', ((lang_name, number, os.path.basename(filepath), position)
+          for position, (filepath, lang_name, number) in enumerate(language_files)))
+    cursor.execute('SELECT id, name FROM languages ORDER BY id')
+    language_answers = [(language_id, language_data.get(lang_name, {}))
+                        for language_id, lang_name in cursor.fetchall()]
+    cursor.execute('SELECT question_number, id FROM questions ORDER BY id')
+    question_ids = cursor.fetchall()
+    
+    # Rows are generated in primary key order (question, then language), so
+    # they are appended to the WITHOUT ROWID b-tree. Loading one language at
+    # a time would put every row at a random position, several times slower.
+    def answer_rows():
+        for question_num, question_id in question_ids:
+            for language_id, answers in language_answers:
+                answer_html = answers.get(question_num)
+                if answer_html:
+                    text = answer_to_text(answer_html)
+                    yield question_id, language_id, answer_html, text, len(text)
+    
+    cursor.executemany('''
+        INSERT INTO answers (question_id, language_id, html, text, length)
+        VALUES (?, ?, ?, ?, ?)
+    ''', answer_rows())
+    print(f"  ✓ Inserted {cursor.rowcount} answers for {len(language_files)} languages")
+    
+    create_source_files_table(cursor)
+    record_source_file(cursor, excel_path, 'questionnaire', None)
+    for filepath, lang_name, _ in language_files:
+        record_source_file(cursor, filepath, 'language', lang_name)
+    timer.lap('insert')
+    
+    create_indexes(cursor)
+    print("  ✓ Created indexes")
+    timer.lap('indexes')
+    
+    print("\n[6/8] Building full-text search index...")
+    document_count = build_search_index(cursor, [lang_name for _, lang_name, _ in language_files])
+    print(f"  ✓ Indexed {document_count} documents")
+    timer.lap('search_index')
+    
+    print("\n[7/8] Computing statistics...")
+    build_statistics(cursor, [lang_name for _, lang_name, _ in language_files])
+    print("  ✓ Stored language, group and question coverage")
+    
+    build_id = record_build_info(cursor)
+    print(f"  ✓ Build id: {build_id}")
+    timer.lap('statistics')
+    
+    print("\n[8/8] Optimizing database...")
+    # Planner statistics for the API's queries, then a compacted file
+    cursor.execute('ANALYZE')
+    conn.commit()
+    cursor.execute('VACUUM')
+    print("  ✓ Analyzed and vacuumed")
+    timer.lap('optimize')
+    
+    # Print statistics
+    cursor.execute("SELECT key, value FROM stats")
+    stats = dict(cursor.fetchall())
+    total_count = stats['total_questions']
     
     print("\n" + "=" * 70)
     print("DATABASE CREATED SUCCESSFULLY!")
     print("=" * 70)
     print(f"Total questions: {total_count}")
-    print(f"Total groups: {group_count}")
-    print(f"Total languages: {len(language_files)}")
+    print(f"Total groups: {stats['total_groups']}")
+    print(f"Total languages: {stats['language_count']}")
+    print(f"Complete responses: {stats['complete_responses']}")
     
     # Show coverage statistics
     print("\nLanguage coverage:")
-    for _, lang_name, _ in language_files:
-        cursor.execute(f'SELECT COUNT(*) FROM questions WHERE {lang_name} IS NOT NULL AND {lang_name} != ""')
-        count = cursor.fetchone()[0]
-        percentage = (count / total_count * 100) if total_count > 0 else 0
+    cursor.execute('SELECT language, answered, percentage FROM language_coverage ORDER BY position')
+    for lang_name, count, percentage in cursor.fetchall():
         print(f"  {lang_name:20s}: {count:3d}/{total_count} ({percentage:5.1f}%)")
     
     # Show some examples
@@ -444,10 +1058,231 @@ def create_database(db_path: str):
     print(f"  Count: {cursor.fetchone()[0]}")
     
     conn.close()
+    return True
 
-if __name__ == '__main__':
-    create_database('grant_database.db')
-    print("\n✓ Database file created: grant_database.db")
+def update_database(db_path: str, only: List[str] = None, jobs: int = None) -> bool:
+    """Incrementally import new or changed language files into an existing database.
+    
+    Each language file's SHA-256 is compared with the hash recorded at its
+    last import, and only new or changed files are parsed and upserted, all in
+    a single transaction. Falls back to a full rebuild when the database does
+    not exist yet or quest.xlsx changed. The changes are applied to a copy
+    that is checked and atomically swapped in.
+    
+    Args:
+        db_path: Path to the SQLite database
+        only: Restrict the update to these language file paths
+        jobs: Number of processes used to parse language files
+    
+    Returns:
+        True if the database was changed
+    """
+    print("=" * 70)
+    print("UPDATING GRANT DATABASE")
+    print("=" * 70)
+    
+    if not os.path.exists(db_path):
+        print("\n  Database does not exist yet, running a full build")
+        create_database(db_path, jobs)
+        return True
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'source_files'")
+    if cursor.fetchone() is None:
+        conn.close()
+        print("\n  Database has no recorded source hashes, running a full build")
+        create_database(db_path, jobs)
+        return True
+    
+    cursor.execute('SELECT path, sha256 FROM source_files')
+    recorded = dict(cursor.fetchall())
+    
+    print("\n[1/3] Checking quest.xlsx...")
+    if recorded.get('quest.xlsx') != file_sha256('quest.xlsx'):
+        conn.close()
+        print("  quest.xlsx changed, running a full build")
+        create_database(db_path, jobs)
+        return True
+    print("  ✓ Unchanged")
+    
+    print("\n[2/3] Checking language files...")
+    language_files = discover_language_files()
+    if only is not None:
+        wanted = {os.path.normpath(path) for path in only}
+        language_files = [f for f in language_files if os.path.normpath(f[0]) in wanted]
+    
+    changed = []
+    for filepath, lang_name, number in language_files:
+        sha256 = file_sha256(filepath)
+        if recorded.get(filepath.replace(os.sep, '/')) == sha256:
+            print(f"  - {lang_name}: unchanged, skipped")
+        else:
+            changed.append((filepath, lang_name, number, sha256))
+            print(f"  ✓ {lang_name}: {'changed' if filepath.replace(os.sep, '/') in recorded else 'new'}")
+    
+    if not changed:
+        conn.close()
+        print("\n✓ Database is up to date")
+        return False
+    
+    print(f"\n[3/3] Importing {len(changed)} language file(s)...")
+    cursor.execute('SELECT question_number, question_text FROM questions')
+    quest_data = dict(cursor.fetchall())
+    parsed = []
+    results = parse_language_files([f[:3] for f in changed], quest_data, jobs)
+    for (filepath, lang_name, number, sha256), (data, error, issues) in zip(changed, results):
+        print_parse_issues(filepath, issues)
+        if error is not None:
+            raise ValueError(f"Could not parse {filepath}: {error}")
+        parsed.append((filepath, lang_name, number, sha256, data))
+    
+    # Apply the changes to a copy and swap it in, as for a full build
+    build_path = build_path_for(db_path)
+    discard_build(build_path)
+    build_conn = sqlite3.connect(build_path)
+    try:
+        conn.backup(build_conn)
+        conn.close()
+        
+        build_cursor = build_conn.cursor()
+        build_cursor.execute('BEGIN')
+        for filepath, lang_name, number, sha256, data in parsed:
+            answer_count = import_language(build_cursor, filepath, lang_name, number, data)
+            record_source_file(build_cursor, filepath, 'language', lang_name, sha256)
+            print(f"  ✓ {lang_name}: {answer_count} answers")
+        
+        build_cursor.execute('SELECT name FROM languages ORDER BY position')
+        build_statistics(build_cursor, [row[0] for row in build_cursor.fetchall()])
+        record_build_info(build_cursor)
+        build_conn.commit()
+        build_conn.close()
+        
+        publish_database(build_path, db_path)
+    finally:
+        conn.close()
+        build_conn.close()
+        discard_build(build_path)
+    
+    print("\n✓ Database updated")
+    return True
+
+def snapshot_sources(excel_path: str = 'quest.xlsx', languages_dir: str = 'languages') -> Dict[str, Tuple[int, int]]:
+    """Return the (mtime_ns, size) of quest.xlsx and every language file, keyed by path."""
+    snapshot = {}
+    for path in [excel_path] + [filepath for filepath, _, _ in discover_language_files(languages_dir)]:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        snapshot[path] = (st.st_mtime_ns, st.st_size)
+    return snapshot
+
+def apply_source_changes(db_path: str, paths: Set[str], present: Dict[str, Tuple[int, int]],
+                         jobs: int = None) -> Set[str]:
+    """Bring db_path up to date after the given source files changed.
+    
+    Changed or new language files are re-imported by update_database().
+    When quest.xlsx is among the paths every source is checked against its
+    recorded hash instead, and a changed quest.xlsx triggers a full build. A
+    removed file also needs a full build, since an update only adds and
+    replaces languages.
+    
+    If importing several language files together fails, each is imported
+    on its own so that one broken file does not hold back the others.
+    
+    Returns:
+        The paths whose update failed, to retry with the next change; the
+        published database is left as it was for them
+    """
+    removed = sorted(path for path in paths if path not in present)
+    try:
+        if removed:
+            print(f"\n  {', '.join(removed)} removed, running a full build")
+            create_database(db_path, jobs)
+        elif 'quest.xlsx' in paths:
+            update_database(db_path, jobs=jobs)
+        else:
+            update_database(db_path, only=sorted(paths), jobs=jobs)
+    except Exception as e:
+        if removed or 'quest.xlsx' in paths or len(paths) == 1:
+            print(f"\n✗ Update failed, still serving the previous build: {e}")
+            return set(paths)
+        
+        # One broken file must not hold back the others
+        print(f"\n✗ Update failed ({e}), importing the files one at a time")
+        return set().union(*(apply_source_changes(db_path, {path}, present, jobs) for path in sorted(paths)))
+    return set()
+
+def watch_database(db_path: str, jobs: int = None, interval: float = 1.0, debounce: float = 2.0):
+    """Keep db_path up to date with quest.xlsx and languages/*.html until interrupted.
+    
+    The sources are polled every `interval` seconds. Once they have stopped
+    changing for `debounce` seconds, so that a burst of saves is imported
+    once, the changes are applied with apply_source_changes(). Every build is
+    checked and swapped in atomically, and the API serves it from its next
+    request on.
+    """
+    print(f"Watching quest.xlsx and languages/*.html (polling every {interval:g}s, "
+          f"debounce {debounce:g}s); press Ctrl+C to stop\n")
+    
+    # Catch up with anything edited while nobody was watching
+    seen = snapshot_sources()
+    failed = apply_source_changes(db_path, set(seen), seen, jobs)
+    pending = set()
+    last_change = time.monotonic()
+    
+    try:
+        while True:
+            time.sleep(interval)
+            current = snapshot_sources()
+            changed = {path for path in seen.keys() | current.keys() if seen.get(path) != current.get(path)}
+            
+            if changed:
+                stamp = datetime.now().strftime('%H:%M:%S')
+                for path in sorted(changed):
+                    state = 'removed' if path not in current else 'new' if path not in seen else 'changed'
+                    print(f"[{stamp}] {path} {state}")
+                pending |= changed | failed
+                failed = set()
+                seen = current
+                last_change = time.monotonic()
+            elif pending and time.monotonic() - last_change >= debounce:
+                failed = apply_source_changes(db_path, pending, current, jobs)
+                pending = set()
+                print(f"\n[{datetime.now().strftime('%H:%M:%S')}] Watching for changes...")
+    except KeyboardInterrupt:
+        print("\n✓ Stopped watching")
+
+def main():
+    parser = argparse.ArgumentParser(description='Build the grant database from quest.xlsx and languages/*.html')
+    parser.add_argument('--db', default='grant_database.db', help='database file (default: grant_database.db)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only re-import language files whose contents changed since the last build')
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help='processes used to parse language files (default: CPU count)')
+    parser.add_argument('--watch', action='store_true',
+                        help='keep running and re-import quest.xlsx and language files as they change')
+    parser.add_argument('--interval', type=float, default=1.0,
+                        help='seconds between checks for changed files with --watch (default: 1)')
+    parser.add_argument('--debounce', type=float, default=2.0,
+                        help='seconds files must stay unchanged before --watch imports them (default: 2)')
+    args = parser.parse_args()
+    
+    if args.watch:
+        watch_database(args.db, args.jobs, args.interval, args.debounce)
+        return
+    
+    if args.incremental:
+        update_database(args.db, jobs=args.jobs)
+        return
+    
+    create_database(args.db, args.jobs)
+    print(f"\n✓ Database file created: {args.db}")
     print("\nNext steps:")
     print("  - Run 'python test_database.py' to verify")
     print("  - Run 'python export_to_postgres.py' to update PostgreSQL schema")
+
+if __name__ == '__main__':
+    main()
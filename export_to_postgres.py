@@ -0,0 +1,498 @@
+"""
+Export the SQLite database to PostgreSQL.
+
+The Postgres DDL is generated from the live SQLite schema (tables, language
+columns, keys, unique constraints and indexes), so it never goes stale when
+languages are added. Rows are streamed with COPY ... FROM STDIN instead of
+per-row INSERTs, and the FTS5 search_index becomes search_documents, which
+storage.PostgresStorage searches with tsvector and pg_trgm indexes.
+
+Usage:
+    python export_to_postgres.py                        # regenerate schema_postgres.sql
+    python export_to_postgres.py --dump grant_dump.sql  # schema + data for psql -f
+    python export_to_postgres.py --dump grant_copy/     # load.sql + one .copy file per table
+    python export_to_postgres.py --load                 # load DATABASE_URL directly
+
+Loads build the new tables in a staging schema and then move them into
+public in one short transaction, so the API keeps serving the complete
+previous data until the swap and the complete new data after it.
+"""
+import argparse
+import os
+import re
+import sqlite3
+import struct
+import sys
+import time
+from collections import namedtuple
+from typing import Dict, Iterator, List, Tuple
+from urllib.parse import quote
+
+try:
+    import psycopg2
+    import psycopg2.errors
+except ImportError:
+    psycopg2 = None
+
+# Build bookkeeping used only by create_database.py --incremental
+EXCLUDED_TABLES = ('source_files',)
+
+# Column types of SQLite's declared types; undeclared columns become TEXT
+PG_TYPES = {'INTEGER': 'INTEGER', 'TEXT': 'TEXT', 'REAL': 'DOUBLE PRECISION'}
+
+# Columns compared bytewise as in SQLite: zero-padded sort keys must not be
+# reordered by the server's locale
+COLUMN_COLLATIONS = {('questions', 'sort_key'): 'C'}
+
+# Loads create and fill their tables here, out of the readers' way
+STAGING_SCHEMA = 'grant_staging'
+
+# The swap moves the replaced tables here and drops them
+RETIRED_SCHEMA = 'grant_retired'
+
+# How long the swap waits for readers' locks before backing off and retrying,
+# so it gives way instead of deadlocking with a query that holds one of them
+SWAP_LOCK_TIMEOUT_MS = 500
+SWAP_ATTEMPTS = 20
+
+# Rows encoded per chunk of COPY data
+COPY_BATCH_SIZE = 1000
+
+# Binary COPY framing: signature, flags and header extension length; -1 field count ends the data
+BINARY_HEADER = b'PGCOPY\n\xff\r\n\x00' + struct.pack('!ii', 0, 0)
+BINARY_TRAILER = struct.pack('!h', -1)
+
+# Binary encodings of non-NULL values, by Postgres type
+BINARY_ENCODERS = {
+    'INTEGER': lambda value: struct.pack('!ii', 4, int(value)),
+    'SERIAL': lambda value: struct.pack('!ii', 4, int(value)),
+    'DOUBLE PRECISION': lambda value: struct.pack('!id', 8, float(value)),
+}
+
+SIMPLE_IDENTIFIER = re.compile(r'^[a-z_][a-z0-9_]*$')
+
+Column = namedtuple('Column', ['name', 'pg_type', 'not_null', 'collation', 'generated'])
+ForeignKey = namedtuple('ForeignKey', ['columns', 'table', 'references'])
+Index = namedtuple('Index', ['name', 'columns', 'unique', 'method'])
+
+class Table:
+    """A table to create in Postgres and the SQLite query that fills it."""
+
+    def __init__(self, name: str, columns: List[Column], primary_key: List[str], source_sql: str,
+                 unique: List[List[str]] = None, foreign_keys: List[ForeignKey] = None,
+                 indexes: List[Index] = None):
+        self.name = name
+        self.columns = columns
+        self.primary_key = primary_key
+        self.source_sql = source_sql
+        self.unique = unique or []
+        self.foreign_keys = foreign_keys or []
+        self.indexes = indexes or []
+
+    @property
+    def copy_columns(self) -> List[Column]:
+        """Columns filled by COPY; generated columns are computed by Postgres."""
+        return [column for column in self.columns if column.generated is None]
+
+def quote_ident(name: str) -> str:
+    """Quote an identifier unless Postgres would read it unchanged."""
+    if SIMPLE_IDENTIFIER.match(name):
+        return name
+    return '"' + name.replace('"', '""') + '"'
+
+def column_list(names) -> str:
+    return ', '.join(quote_ident(name) for name in names)
+
+def read_table(conn, name: str, table_sql: str) -> Table:
+    """Describe one SQLite table as a Table."""
+    info = conn.execute(f'PRAGMA table_info({quote_ident(name)})').fetchall()
+    primary_key = [row[1] for row in sorted(info, key=lambda row: row[5]) if row[5]]
+    autoincrement = 'AUTOINCREMENT' in table_sql.upper()
+
+    columns = []
+    for _, column, declared, not_null, _, pk in info:
+        pg_type = PG_TYPES.get(declared.upper(), 'TEXT')
+        if autoincrement and primary_key == [column] and pg_type == 'INTEGER':
+            pg_type = 'SERIAL'
+        columns.append(Column(column, pg_type, bool(not_null) or bool(pk),
+                              COLUMN_COLLATIONS.get((name, column)), None))
+
+    unique, indexes = [], []
+    for _, index_name, is_unique, origin, _ in conn.execute(f'PRAGMA index_list({quote_ident(name)})').fetchall():
+        index_columns = [row[2] for row in conn.execute(f'PRAGMA index_info({quote_ident(index_name)})').fetchall()]
+        if origin == 'u':
+            unique.append(index_columns)
+        elif origin == 'c':
+            indexes.append(Index(index_name, index_columns, bool(is_unique), None))
+    indexes.sort()
+
+    foreign_keys = {}
+    for fk_id, _, parent, from_column, to_column, *_ in conn.execute(
+            f'PRAGMA foreign_key_list({quote_ident(name)})').fetchall():
+        columns_from, _, columns_to = foreign_keys.setdefault(fk_id, ([], parent, []))
+        columns_from.append(from_column)
+        columns_to.append(to_column)
+
+    order_sql = f' ORDER BY {column_list(primary_key)}' if primary_key else ''
+    return Table(
+        name, columns, primary_key,
+        f'SELECT {column_list(column.name for column in columns)} FROM {quote_ident(name)}{order_sql}',
+        unique=unique,
+        foreign_keys=[ForeignKey(*foreign_keys[fk_id]) for fk_id in sorted(foreign_keys)],
+        indexes=indexes
+    )
+
+def search_documents_table() -> Table:
+    """The Postgres replacement for the FTS5 search_index."""
+    return Table(
+        'search_documents',
+        [
+            Column('question_id', 'INTEGER', True, None, None),
+            Column('language', 'TEXT', True, None, None),
+            Column('content', 'TEXT', True, None, None),
+            Column('document', 'TSVECTOR', False, None, "to_tsvector('simple', content)"),
+        ],
+        [],
+        'SELECT question_id, language, content FROM search_index ORDER BY question_id',
+        foreign_keys=[ForeignKey(['question_id'], 'questions', ['id'])],
+        indexes=[
+            Index('idx_search_documents_document', ['document'], False, 'GIN'),
+            Index('idx_search_documents_question', ['question_id', 'language'], False, None),
+            Index('idx_search_documents_trigram', ['content gin_trgm_ops'], False, 'GIN'),
+        ]
+    )
+
+def read_tables(conn) -> List[Table]:
+    """Every exported table, parents before the tables referencing them."""
+    rows = conn.execute("""
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'table' AND name NOT LIKE 'sqlite_%'
+        ORDER BY rowid
+    """).fetchall()
+    virtual = {name for name, sql in rows if sql.upper().startswith('CREATE VIRTUAL TABLE')}
+
+    tables = []
+    for name, sql in rows:
+        # FTS5 keeps its data in shadow tables named after the virtual table
+        if name in EXCLUDED_TABLES or name in virtual or any(name.startswith(v + '_') for v in virtual):
+            continue
+        tables.append(read_table(conn, name, sql))
+    if 'search_index' in virtual:
+        tables.append(search_documents_table())
+
+    # Parents first, so foreign keys and the DROP order line up
+    ordered, placed = [], set()
+    while tables:
+        ready = [t for t in tables if all(fk.table in placed or fk.table == t.name for fk in t.foreign_keys)]
+        if not ready:
+            raise ValueError(f"Circular foreign keys between: {', '.join(t.name for t in tables)}")
+        for table in ready:
+            ordered.append(table)
+            placed.add(table.name)
+        tables = [t for t in tables if t.name not in placed]
+    return ordered
+
+def create_table_sql(table: Table) -> str:
+    """CREATE TABLE with columns, primary key and unique constraints."""
+    lines = []
+    for column in table.columns:
+        line = f'    {quote_ident(column.name)} {column.pg_type}'
+        if column.collation:
+            line += f' COLLATE "{column.collation}"'
+        if column.generated:
+            line += f' GENERATED ALWAYS AS ({column.generated}) STORED'
+        elif column.not_null and column.name not in table.primary_key:
+            line += ' NOT NULL'
+        lines.append(line)
+    if table.primary_key:
+        lines.append(f'    PRIMARY KEY ({column_list(table.primary_key)})')
+    for columns in table.unique:
+        lines.append(f'    UNIQUE ({column_list(columns)})')
+    return f'CREATE TABLE {quote_ident(table.name)} (\n' + ',\n'.join(lines) + '\n);'
+
+def schema_statements(tables: List[Table], drop: bool = True) -> Tuple[List[str], List[str]]:
+    """DDL to run before loading the rows, and DDL to run after.
+
+    Foreign keys and secondary indexes are added after the load, which is
+    much faster than maintaining them row by row.
+    """
+    before = ['CREATE EXTENSION IF NOT EXISTS pg_trgm;']
+    if drop:
+        before.append('\n'.join(f'DROP TABLE IF EXISTS {quote_ident(table.name)} CASCADE;'
+                                 for table in reversed(tables)))
+    before += [create_table_sql(table) for table in tables]
+
+    after = []
+    for table in tables:
+        for column in table.columns:
+            if column.pg_type == 'SERIAL':
+                # COPY writes the ids explicitly; move the sequence past them
+                after.append(
+                    f"SELECT setval(pg_get_serial_sequence('{table.name}', '{column.name}'), "
+                    f"COALESCE(MAX({quote_ident(column.name)}), 1), MAX({quote_ident(column.name)}) IS NOT NULL) "
+                    f"FROM {quote_ident(table.name)};"
+                )
+        for fk in table.foreign_keys:
+            after.append(
+                f'ALTER TABLE {quote_ident(table.name)} ADD FOREIGN KEY ({column_list(fk.columns)}) '
+                f'REFERENCES {quote_ident(fk.table)} ({column_list(fk.references)});'
+            )
+        for index in table.indexes:
+            # Index columns may carry an operator class, so they are not quoted
+            after.append(
+                f"CREATE {'UNIQUE ' if index.unique else ''}INDEX {quote_ident(index.name)} "
+                f"ON {quote_ident(table.name)}{f' USING {index.method}' if index.method else ''} "
+                f"({', '.join(index.columns)});"
+            )
+    return before, after
+
+def load_statements(tables: List[Table]) -> Tuple[List[str], List[str], List[str]]:
+    """DDL for a load that readers never see half done.
+
+    Returns the statements to run before the COPYs, which create the tables
+    in STAGING_SCHEMA; the ones to run after them in the same transaction,
+    which add keys and indexes and ANALYZE the new rows; and the swap, which
+    moves the current tables out of public and the new ones in. The swap
+    only renames, so it holds its locks for milliseconds, and readers see
+    either all of the old tables or all of the new ones.
+    """
+    before, after = schema_statements(tables, drop=False)
+    names = [quote_ident(table.name) for table in tables]
+    staging = [
+        # Before search_path changes, so the extension stays in public
+        before[0],
+        f'DROP SCHEMA IF EXISTS {STAGING_SCHEMA} CASCADE;',
+        f'CREATE SCHEMA {STAGING_SCHEMA};',
+        f'SET LOCAL search_path TO {STAGING_SCHEMA}, public;',
+    ] + before[1:]
+    after = after + [f"ANALYZE {', '.join(names)};"]
+
+    swap = [f'DROP SCHEMA IF EXISTS {RETIRED_SCHEMA} CASCADE;', f'CREATE SCHEMA {RETIRED_SCHEMA};']
+    swap += [f'ALTER TABLE IF EXISTS public.{name} SET SCHEMA {RETIRED_SCHEMA};' for name in reversed(names)]
+    swap += [f'ALTER TABLE {STAGING_SCHEMA}.{name} SET SCHEMA public;' for name in names]
+    swap += [f'DROP SCHEMA {RETIRED_SCHEMA} CASCADE;', f'DROP SCHEMA {STAGING_SCHEMA};']
+    return staging, after, swap
+
+def copy_sql(table: Table, data_format: str, source: str = 'STDIN', command: str = 'COPY') -> str:
+    """COPY statement (or psql \\copy command) loading a table's rows."""
+    return (f'{command} {quote_ident(table.name)} ({column_list(c.name for c in table.copy_columns)}) '
+            f'FROM {source} WITH (FORMAT {data_format})')
+
+def csv_field(value) -> str:
+    """One CSV field; text is always quoted so '' stays distinct from NULL."""
+    if value is None:
+        return ''
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    return repr(value) if isinstance(value, float) else str(value)
+
+def encode_csv(rows, columns: List[Column]) -> bytes:
+    return ''.join(','.join(csv_field(value) for value in row) + '\n' for row in rows).encode('utf-8')
+
+def encode_binary(rows, columns: List[Column]) -> bytes:
+    encoders = [BINARY_ENCODERS.get(column.pg_type) for column in columns]
+    null = struct.pack('!i', -1)
+    field_count = struct.pack('!h', len(columns))
+    parts = []
+    for row in rows:
+        parts.append(field_count)
+        for value, encoder in zip(row, encoders):
+            if value is None:
+                parts.append(null)
+            elif encoder is not None:
+                parts.append(encoder(value))
+            else:
+                data = str(value).encode('utf-8')
+                parts.append(struct.pack('!i', len(data)))
+                parts.append(data)
+    return b''.join(parts)
+
+def copy_data(conn, table: Table, data_format: str, counts: Dict[str, int]) -> Iterator[bytes]:
+    """Stream a table's rows from SQLite as COPY data, counting them in counts."""
+    columns = table.copy_columns
+    encode = encode_binary if data_format == 'binary' else encode_csv
+    counts[table.name] = 0
+    if data_format == 'binary':
+        yield BINARY_HEADER
+
+    cursor = conn.execute(table.source_sql)
+    while True:
+        rows = cursor.fetchmany(COPY_BATCH_SIZE)
+        if not rows:
+            break
+        counts[table.name] += len(rows)
+        yield encode(rows, columns)
+
+    if data_format == 'binary':
+        yield BINARY_TRAILER
+
+class ChunkReader:
+    """File-like view of a byte-chunk iterator, for cursor.copy_expert()."""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._buffer = bytearray()
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self._buffer) < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer += chunk
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+def schema_header(db_path: str) -> str:
+    return (
+        '-- PostgreSQL schema for Grant Database\n'
+        f'-- Generated from {os.path.basename(db_path)} by export_to_postgres.py; do not edit by hand.\n'
+        '-- Re-run the exporter after adding languages or changing create_database.py.\n'
+    )
+
+def write_schema(tables: List[Table], db_path: str, path: str):
+    """Write the DDL alone, for reference and for creating an empty database."""
+    before, after = schema_statements(tables)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(schema_header(db_path) + '\n')
+        f.write('\n\n'.join(before + after) + '\n')
+
+def dump_sql(conn, tables: List[Table], db_path: str, path: str) -> Dict[str, int]:
+    """Write a psql script creating the schema and loading every row (CSV COPY blocks)."""
+    before, after, swap = load_statements(tables)
+    counts = {}
+    with open(path, 'wb') as f:
+        f.write((schema_header(db_path) + '-- Load with: psql "$DATABASE_URL" -v ON_ERROR_STOP=1 -f '
+                 + os.path.basename(path) + '\n\nBEGIN;\n\n').encode('utf-8'))
+        f.write(('\n\n'.join(before) + '\n\n').encode('utf-8'))
+        for table in tables:
+            f.write((copy_sql(table, 'csv') + ';\n').encode('utf-8'))
+            for chunk in copy_data(conn, table, 'csv', counts):
+                f.write(chunk)
+            f.write(b'\\.\n\n')
+        f.write(('\n\n'.join(after) + '\n\nCOMMIT;\n\n').encode('utf-8'))
+        f.write(('BEGIN;\n\n' + '\n'.join(swap) + '\n\nCOMMIT;\n').encode('utf-8'))
+    return counts
+
+def dump_directory(conn, tables: List[Table], db_path: str, path: str, data_format: str) -> Dict[str, int]:
+    """Write one .copy file per table plus a load.sql that \\copy-s them in."""
+    os.makedirs(path, exist_ok=True)
+    before, after, swap = load_statements(tables)
+    counts = {}
+    for table in tables:
+        with open(os.path.join(path, f'{table.name}.copy'), 'wb') as f:
+            for chunk in copy_data(conn, table, data_format, counts):
+                f.write(chunk)
+
+    with open(os.path.join(path, 'load.sql'), 'w', encoding='utf-8') as f:
+        f.write(schema_header(db_path))
+        f.write('-- Load from this directory with: psql "$DATABASE_URL" -v ON_ERROR_STOP=1 -f load.sql\n\nBEGIN;\n\n')
+        f.write('\n\n'.join(before) + '\n\n')
+        for table in tables:
+            f.write(copy_sql(table, data_format, f"'{table.name}.copy'", command='\\copy') + '\n')
+        f.write('\n' + '\n\n'.join(after) + '\n\nCOMMIT;\n\n')
+        f.write('BEGIN;\n\n' + '\n'.join(swap) + '\n\nCOMMIT;\n')
+    return counts
+
+def load_postgres(conn, tables: List[Table], database_url: str, data_format: str) -> Dict[str, int]:
+    """COPY every table into a staging schema, then swap the new tables in.
+
+    See load_statements(). If readers keep the swap from getting its locks
+    within SWAP_LOCK_TIMEOUT_MS, it rolls back and tries again.
+    """
+    if psycopg2 is None:
+        raise RuntimeError('psycopg2 is required to load Postgres directly (pip install psycopg2-binary)')
+    before, after, swap = load_statements(tables)
+    counts = {}
+
+    pg = psycopg2.connect(database_url)
+    try:
+        with pg:
+            with pg.cursor() as cursor:
+                for statement in before:
+                    cursor.execute(statement)
+                for table in tables:
+                    started = time.perf_counter()
+                    cursor.copy_expert(copy_sql(table, data_format),
+                                       ChunkReader(copy_data(conn, table, data_format, counts)), size=1 << 16)
+                    print(f"  ✓ {table.name}: {counts[table.name]} rows ({time.perf_counter() - started:.2f}s)")
+                for statement in after:
+                    cursor.execute(statement)
+
+        for attempt in range(1, SWAP_ATTEMPTS + 1):
+            try:
+                with pg:
+                    with pg.cursor() as cursor:
+                        cursor.execute(f"SET LOCAL lock_timeout = '{SWAP_LOCK_TIMEOUT_MS}ms'")
+                        for statement in swap:
+                            cursor.execute(statement)
+                break
+            except psycopg2.errors.LockNotAvailable:
+                if attempt == SWAP_ATTEMPTS:
+                    raise
+        print(f"  ✓ Swapped the new tables in ({attempt} attempt{'s' if attempt > 1 else ''})")
+    finally:
+        pg.close()
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description='Export the SQLite grant database to PostgreSQL')
+    parser.add_argument('--db', default='grant_database.db', help='SQLite database (default: grant_database.db)')
+    parser.add_argument('--schema', default='schema_postgres.sql',
+                        help='where to write the generated DDL (default: schema_postgres.sql)')
+    parser.add_argument('--dump', metavar='PATH',
+                        help='write schema and data: a .sql file (psql script with CSV COPY blocks) '
+                             'or a directory (load.sql plus one .copy file per table)')
+    parser.add_argument('--load', action='store_true', help='load the data into Postgres directly')
+    parser.add_argument('--database-url', default=os.environ.get('DATABASE_URL'),
+                        help='Postgres connection string for --load (default: $DATABASE_URL)')
+    parser.add_argument('--format', choices=('binary', 'csv'), default='binary',
+                        help='COPY format for --load and directory dumps (default: binary)')
+    args = parser.parse_args()
+
+    if args.load and not args.database_url:
+        parser.error('--load needs --database-url or DATABASE_URL')
+    if not os.path.exists(args.db):
+        print(f"✗ ERROR: {args.db} not found. Run 'python create_database.py' first.")
+        sys.exit(1)
+
+    print("=" * 70)
+    print("EXPORTING TO POSTGRESQL")
+    print("=" * 70)
+    steps = 1 + bool(args.dump) + bool(args.load)
+    step = 1
+
+    conn = sqlite3.connect(f'file:{quote(os.path.abspath(args.db))}?mode=ro', uri=True)
+    try:
+        tables = read_tables(conn)
+        print(f"\n[{step}/{steps}] Generating schema from {args.db}...")
+        write_schema(tables, args.db, args.schema)
+        print(f"  ✓ {len(tables)} tables written to {args.schema}")
+
+        if args.dump:
+            step += 1
+            started = time.perf_counter()
+            print(f"\n[{step}/{steps}] Dumping data to {args.dump}...")
+            if args.dump.endswith('.sql'):
+                counts = dump_sql(conn, tables, args.db, args.dump)
+            else:
+                counts = dump_directory(conn, tables, args.db, args.dump, args.format)
+            for name, count in counts.items():
+                print(f"  ✓ {name}: {count} rows")
+            print(f"  ✓ Done in {time.perf_counter() - started:.2f}s")
+
+        if args.load:
+            step += 1
+            started = time.perf_counter()
+            print(f"\n[{step}/{steps}] Loading Postgres with COPY ({args.format})...")
+            load_postgres(conn, tables, args.database_url, args.format)
+            print(f"  ✓ Done in {time.perf_counter() - started:.2f}s")
+    finally:
+        conn.close()
+
+    print("\n✓ Export complete")
+
+if __name__ == '__main__':
+    main()
@@ -19,24 +19,26 @@ for row in cursor.fetchall():
 # Test 2: Verify "будет уточнено" answers are captured
 print("\n\n✓ TEST 2: Placeholder answers ('будет уточнено', 'будет заполнено позднее') captured")
 print("-"*100)
-cursor.execute('''SELECT question_number, question_text, russian, muira 
-                  FROM questions 
-                  WHERE russian LIKE '%будет%' OR muira LIKE '%будет%' 
+cursor.execute('''SELECT q.question_number, q.question_text, l.name, a.text
+                  FROM answers a
+                  JOIN questions q ON q.id = a.question_id
+                  JOIN languages l ON l.id = a.language_id
+                  WHERE l.name IN ('russian', 'muira') AND a.text LIKE '%будет%'
+                  ORDER BY q.sort_key, l.position
                   LIMIT 5''')
 for row in cursor.fetchall():
     print(f"\nQuestion {row[0]}: {row[1][:60]}...")
-    if row[2] and 'будет' in row[2].lower():
-        print(f"  Russian: {row[2]}")
-    if row[3] and 'будет' in row[3].lower():
-        print(f"  Muira: {row[3]}")
+    print(f"  {row[2].capitalize()}: {row[3]}")
 
 # Test 3: Verify long answers are fully captured
 print("\n\n✓ TEST 3: Long multi-paragraph answers fully captured")
 print("-"*100)
-cursor.execute('''SELECT question_number, question_text, LENGTH(russian) as len, russian 
-                  FROM questions 
-                  WHERE LENGTH(russian) > 500 
-                  ORDER BY len DESC LIMIT 3''')
+cursor.execute('''SELECT q.question_number, q.question_text, a.length, a.text
+                  FROM answers a
+                  JOIN questions q ON q.id = a.question_id
+                  JOIN languages l ON l.id = a.language_id
+                  WHERE l.name = 'russian' AND a.length > 500
+                  ORDER BY a.length DESC LIMIT 3''')
 for row in cursor.fetchall():
     print(f"\nQuestion {row[0]}: {row[1][:60]}...")
     print(f"  Answer length: {row[2]} characters")
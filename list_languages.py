@@ -5,6 +5,7 @@ import sqlite3
 import os
 import glob
 import re
+from schema_cache import get_schema_cache
 
 def show_database_languages():
     """Display all languages in the database with coverage stats."""
@@ -18,17 +19,14 @@ def show_database_languages():
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     
-    # Get all column names
-    cursor.execute('PRAGMA table_info(questions)')
-    columns = cursor.fetchall()
+    # Language columns in import order
+    language_columns = get_schema_cache(db_path).language_columns(conn)
     
-    # Filter for language columns (exclude id, question_number, group_id, question_text)
-    system_columns = {'id', 'question_number', 'group_id', 'question_text'}
-    language_columns = [col[1] for col in columns if col[1] not in system_columns]
-    
-    # Get total questions
-    cursor.execute('SELECT COUNT(*) FROM questions')
+    # Coverage precomputed by create_database.py
+    cursor.execute("SELECT value FROM stats WHERE key = 'total_questions'")
     total_questions = cursor.fetchone()[0]
+    cursor.execute('SELECT language, answered, percentage FROM language_coverage')
+    coverage = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
     
     print("=" * 70)
     print("LANGUAGES IN DATABASE")
@@ -41,9 +39,7 @@ def show_database_languages():
     print("-" * 70)
     
     for i, lang_name in enumerate(language_columns, 1):
-        cursor.execute(f'SELECT COUNT(*) FROM questions WHERE {lang_name} IS NOT NULL AND {lang_name} != ""')
-        count = cursor.fetchone()[0]
-        percentage = (count / total_questions * 100) if total_questions > 0 else 0
+        count, percentage = coverage.get(lang_name, (0, 0.0))
         print(f"{i:<4} {lang_name:<25} {count:>3}/{total_questions:<5} {percentage:>5.1f}%")
     
     conn.close()
@@ -0,0 +1,79 @@
+"""
+In-memory random sampling of questions for /api/questions/random.
+
+The sampler holds the question ids of every group (in sort_key order) and
+each question's language coverage, so a draw never touches the database:
+uniform draws of k distinct ids cost O(k) and need no ORDER BY RANDOM().
+"""
+import bisect
+import heapq
+import random
+from typing import Dict, List, Optional, Sequence
+
+class QuestionSampler:
+    """Samples question ids from one or more groups."""
+
+    def __init__(self, group_ids: Dict[str, List[int]], coverage: Dict[int, int]):
+        """
+        Args:
+            group_ids: Maps group numbers to their question ids
+            coverage: Maps question ids to the number of languages answering them
+        """
+        self.group_ids = group_ids
+        self.coverage = coverage
+
+    @classmethod
+    def load(cls, conn) -> 'QuestionSampler':
+        """Build a sampler from the questions and question_coverage tables."""
+        group_ids = {}
+        for group_number, question_id in conn.execute('''
+            SELECT g.group_number, q.id
+            FROM questions q
+            JOIN groups g ON q.group_id = g.id
+            ORDER BY CAST(g.group_number AS INTEGER), q.sort_key
+        '''):
+            group_ids.setdefault(group_number, []).append(question_id)
+
+        coverage = dict(conn.execute('SELECT question_id, answered FROM question_coverage').fetchall())
+        return cls(group_ids, coverage)
+
+    def sample(self, groups: Sequence[str], count: int, seed: Optional[str] = None,
+               weighted: bool = False) -> List[int]:
+        """Draw up to count distinct question ids from the given groups.
+
+        Args:
+            groups: Group numbers to sample from; their questions are pooled
+            count: Number of ids to draw (fewer if the groups are smaller)
+            seed: Makes the draw reproducible when given
+            weighted: Weight questions by language coverage; questions no
+                language answers are never drawn
+
+        Raises:
+            KeyError: for an unknown group number
+        """
+        rng = random.Random(seed)
+        pools = [self.group_ids[group] for group in groups]
+
+        if weighted:
+            # Efraimidis-Spirakis weighted sampling without replacement: O(n log k)
+            keyed = ((rng.random() ** (1.0 / self.coverage[qid]), qid)
+                     for pool in pools for qid in pool if self.coverage.get(qid))
+            return [qid for _, qid in heapq.nlargest(count, keyed)]
+
+        # Uniform: sample positions in the concatenated pools without
+        # materializing them, O(k) plus a bisect per draw
+        offsets = []
+        total = 0
+        for pool in pools:
+            offsets.append(total)
+            total += len(pool)
+
+        picked = []
+        for position in rng.sample(range(total), min(count, total)):
+            index = bisect.bisect_right(offsets, position) - 1
+            picked.append(pools[index][position - offsets[index]])
+        return picked
+
+    def all_groups(self) -> List[str]:
+        """Every group number, in group order."""
+        return list(self.group_ids)
@@ -0,0 +1,111 @@
+"""
+In-memory cache of serialized API responses.
+
+Responses are deterministic for a given database build, so entries are keyed
+by endpoint and normalized request arguments and are all dropped as soon as
+the dataset version changes. Within a version, entries expire after a TTL and
+the least recently used ones are evicted to stay within a byte budget.
+Each entry holds the identity body and its precompressed encodings, so a
+response is compressed once per dataset version rather than per request.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+class ResponseCache:
+    """Thread-safe LRU/TTL cache of response bodies for one worker process."""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def _check_version(self, version: str):
+        """Drop every entry if the dataset version changed. Caller holds the lock."""
+        if version == self._version:
+            return
+        if self._entries:
+            self.invalidations += 1
+            self.evictions += len(self._entries)
+        self._entries.clear()
+        self._bytes = 0
+        self._version = version
+
+    def _remove(self, key: Hashable):
+        """Remove one entry. Caller holds the lock."""
+        _, variants, _ = self._entries.pop(key)
+        self._bytes -= sum(len(body) for body in variants.values())
+
+    def get(self, version: str, key: Hashable) -> Optional[Tuple[Dict[str, bytes], str]]:
+        """Return (variants, mimetype) for a fresh entry, or None on a miss.
+
+        variants maps content codings ('identity', 'gzip', 'br') to bodies.
+        """
+        with self._lock:
+            self._check_version(version)
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, variants, mimetype = entry
+            if expires_at < time.monotonic():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return variants, mimetype
+
+    def put(self, version: str, key: Hashable, variants: Dict[str, bytes], mimetype: str):
+        """Store a response's encoded bodies, evicting least recently used entries as needed."""
+        size = sum(len(body) for body in variants.values())
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._check_version(version)
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl, variants, mimetype)
+            self._bytes += size
+
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        """Drop every entry."""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def get_stats(self) -> Dict:
+        """Return hit/miss/eviction counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'version': self._version,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations
+            }
@@ -0,0 +1,114 @@
+"""
+Cached schema metadata for the grant database.
+
+The API and the CLI scripts use this instead of running PRAGMA table_info
+themselves. Metadata is loaded once and reused until the database file's
+mtime or its PRAGMA schema_version changes, or the file is replaced by a
+new build.
+"""
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import quote
+
+# Columns of the questions table that do not hold language answers
+SYSTEM_COLUMNS = ('id', 'question_number', 'group_id', 'question_text', 'sort_key')
+
+class SchemaCache:
+    """Language-column metadata for one database file."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._file_id = None
+        self._schema_version = None
+        self._columns = None
+        self._language_columns = None
+        self._languages = None
+        self.loads = 0
+
+    def _read_schema_version(self, conn) -> int:
+        return conn.execute('PRAGMA schema_version').fetchone()[0]
+
+    def _load(self, conn, file_id: tuple):
+        """Read the questions table layout. Caller holds the lock."""
+        schema_version = self._read_schema_version(conn)
+        columns = [row[1] for row in conn.execute('PRAGMA table_info(questions)').fetchall()]
+        if not columns:
+            raise sqlite3.OperationalError(f'no such table: questions in {self.db_path}')
+
+        self._columns = columns
+        self._language_columns = [col for col in columns if col not in SYSTEM_COLUMNS]
+        self._languages = sorted(self._language_columns)
+        self._file_id = file_id
+        self._schema_version = schema_version
+        self.loads += 1
+
+    def _refresh(self, conn=None):
+        """Reload the metadata if the database changed since the last load.
+
+        `conn` is only used to notice a schema change. A pooled connection can
+        still have a replaced build open, so the metadata itself is always read
+        through a new connection opened after the file was stat'ed: at worst
+        that loads a newer file than file_id describes, which the next call
+        reloads.
+        """
+        # Raises FileNotFoundError for a missing database instead of letting
+        # sqlite3.connect() silently create an empty one
+        st = os.stat(self.db_path)
+        file_id = (st.st_ino, st.st_mtime_ns)
+
+        with self._lock:
+            if self._columns is not None and file_id == self._file_id:
+                if conn is None or self._read_schema_version(conn) == self._schema_version:
+                    return
+
+            # Read-only, so no journal or WAL is created next to the served file
+            own_conn = sqlite3.connect(f'file:{quote(os.path.abspath(self.db_path))}?mode=ro', uri=True)
+            try:
+                self._load(own_conn, file_id)
+            finally:
+                own_conn.close()
+
+    def invalidate(self):
+        """Forget the cached metadata so the next lookup reloads it."""
+        with self._lock:
+            self._columns = None
+
+    def columns(self, conn=None) -> List[str]:
+        """All columns of the questions table in table order."""
+        self._refresh(conn)
+        return list(self._columns)
+
+    def language_columns(self, conn=None) -> List[str]:
+        """Language columns in table (import) order."""
+        self._refresh(conn)
+        return list(self._language_columns)
+
+    def languages(self, conn=None) -> List[str]:
+        """Language columns sorted alphabetically."""
+        self._refresh(conn)
+        return list(self._languages)
+
+    def get_stats(self) -> Dict:
+        """Return the cache state for diagnostics."""
+        with self._lock:
+            return {
+                'db_path': self.db_path,
+                'loads': self.loads,
+                'schema_version': self._schema_version,
+                'languages': len(self._languages) if self._columns is not None else None
+            }
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+def get_schema_cache(db_path: str = 'grant_database.db') -> SchemaCache:
+    """Get the process-wide schema cache for a database file."""
+    key = os.path.abspath(db_path)
+    with _caches_lock:
+        cache: Optional[SchemaCache] = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = SchemaCache(db_path)
+        return cache
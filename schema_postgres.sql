@@ -1,22 +1,77 @@
-﻿-- PostgreSQL schema for Grant Database
--- Compatible with render.com
--- NOTE: This schema needs to be updated whenever new languages are added.
--- Run export_to_postgres.py to generate an updated schema automatically.
+-- PostgreSQL schema for Grant Database
+-- Generated from grant_database.db by export_to_postgres.py; do not edit by hand.
+-- Re-run the exporter after adding languages or changing create_database.py.
 
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+DROP TABLE IF EXISTS search_documents CASCADE;
+DROP TABLE IF EXISTS question_coverage CASCADE;
+DROP TABLE IF EXISTS answers CASCADE;
 DROP TABLE IF EXISTS questions CASCADE;
+DROP TABLE IF EXISTS build_info CASCADE;
+DROP TABLE IF EXISTS language_coverage CASCADE;
+DROP TABLE IF EXISTS group_stats CASCADE;
+DROP TABLE IF EXISTS stats CASCADE;
+DROP TABLE IF EXISTS languages CASCADE;
 DROP TABLE IF EXISTS groups CASCADE;
 
 CREATE TABLE groups (
-    id SERIAL PRIMARY KEY,
-    group_number INTEGER UNIQUE NOT NULL,
-    group_name TEXT NOT NULL
+    id SERIAL,
+    group_number TEXT NOT NULL,
+    group_name TEXT NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE (group_number)
+);
+
+CREATE TABLE languages (
+    id SERIAL,
+    name TEXT NOT NULL,
+    number TEXT NOT NULL,
+    source_file TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (id),
+    UNIQUE (name)
+);
+
+CREATE TABLE stats (
+    key TEXT,
+    value INTEGER NOT NULL,
+    PRIMARY KEY (key)
+);
+
+CREATE TABLE group_stats (
+    group_number TEXT,
+    group_name TEXT NOT NULL,
+    question_count INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (group_number)
+);
+
+CREATE TABLE language_coverage (
+    language TEXT,
+    position INTEGER NOT NULL,
+    answered INTEGER NOT NULL,
+    total INTEGER NOT NULL,
+    percentage DOUBLE PRECISION NOT NULL,
+    length_min INTEGER NOT NULL,
+    length_p50 INTEGER NOT NULL,
+    length_p90 INTEGER NOT NULL,
+    length_p99 INTEGER NOT NULL,
+    length_max INTEGER NOT NULL,
+    PRIMARY KEY (language)
+);
+
+CREATE TABLE build_info (
+    build_id TEXT NOT NULL,
+    built_at TEXT NOT NULL
 );
 
 CREATE TABLE questions (
-    id SERIAL PRIMARY KEY,
-    question_number VARCHAR(20) UNIQUE NOT NULL,
-    group_id INTEGER NOT NULL REFERENCES groups(id),
+    id SERIAL,
+    question_number TEXT NOT NULL,
+    group_id INTEGER NOT NULL,
     question_text TEXT NOT NULL,
+    sort_key TEXT COLLATE "C" NOT NULL,
     russian TEXT,
     muira TEXT,
     danish TEXT,
@@ -25,7 +80,7 @@ CREATE TABLE questions (
     polish TEXT,
     bulgarian TEXT,
     nanai TEXT,
-    nornakhichevan TEXT,
+    nor_nakhichevan TEXT,
     udmurt TEXT,
     greben TEXT,
     mountmari TEXT,
@@ -36,23 +91,61 @@ CREATE TABLE questions (
     northernkhanty TEXT,
     ulch TEXT,
     abaza TEXT,
-    turkish TEXT
+    turkish TEXT,
+    PRIMARY KEY (id),
+    UNIQUE (question_number)
 );
 
-CREATE INDEX idx_group_id ON questions(group_id);
+CREATE TABLE answers (
+    question_id INTEGER,
+    language_id INTEGER,
+    html TEXT NOT NULL,
+    text TEXT NOT NULL,
+    length INTEGER NOT NULL,
+    PRIMARY KEY (question_id, language_id)
+);
+
+CREATE TABLE question_coverage (
+    question_id INTEGER,
+    answered INTEGER NOT NULL,
+    complete INTEGER NOT NULL,
+    bitmap TEXT NOT NULL,
+    PRIMARY KEY (question_id)
+);
+
+CREATE TABLE search_documents (
+    question_id INTEGER NOT NULL,
+    language TEXT NOT NULL,
+    content TEXT NOT NULL,
+    document TSVECTOR GENERATED ALWAYS AS (to_tsvector('simple', content)) STORED
+);
+
+SELECT setval(pg_get_serial_sequence('groups', 'id'), COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM groups;
+
+SELECT setval(pg_get_serial_sequence('languages', 'id'), COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM languages;
+
+SELECT setval(pg_get_serial_sequence('questions', 'id'), COALESCE(MAX(id), 1), MAX(id) IS NOT NULL) FROM questions;
+
+ALTER TABLE questions ADD FOREIGN KEY (group_id) REFERENCES groups (id);
+
+CREATE INDEX idx_group_id ON questions (group_id);
+
+CREATE INDEX idx_questions_group_sort ON questions (group_id, sort_key);
+
+CREATE INDEX idx_questions_sort ON questions (sort_key);
+
+ALTER TABLE answers ADD FOREIGN KEY (language_id) REFERENCES languages (id);
+
+ALTER TABLE answers ADD FOREIGN KEY (question_id) REFERENCES questions (id);
+
+CREATE INDEX idx_answers_language ON answers (language_id, question_id, length);
+
+ALTER TABLE question_coverage ADD FOREIGN KEY (question_id) REFERENCES questions (id);
 
--- Note: Data will be populated by the application using export_to_postgres.py
--- or by running create_database.py and then exporting the SQLite data
+ALTER TABLE search_documents ADD FOREIGN KEY (question_id) REFERENCES questions (id);
 
--- Example queries:
--- Get all questions in a group:
--- SELECT q.*, g.group_name FROM questions q JOIN groups g ON q.group_id = g.id WHERE g.group_number = 1;
+CREATE INDEX idx_search_documents_document ON search_documents USING GIN (document);
 
--- Get random question from a group:
--- SELECT q.*, g.group_name FROM questions q JOIN groups g ON q.group_id = g.id WHERE g.group_number = 2 ORDER BY RANDOM() LIMIT 1;
+CREATE INDEX idx_search_documents_question ON search_documents (question_id, language);
 
--- Get statistics:
--- SELECT g.group_number, g.group_name, COUNT(q.id) as question_count 
--- FROM groups g LEFT JOIN questions q ON g.id = q.group_id 
--- GROUP BY g.id, g.group_number, g.group_name 
--- ORDER BY g.group_number;
+CREATE INDEX idx_search_documents_trigram ON search_documents USING GIN (content gin_trgm_ops);
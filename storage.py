@@ -0,0 +1,733 @@
+"""
+Storage backends for the Flask API.
+
+SQLiteStorage serves the file built by create_database.py through a pool of
+read-only connections. PostgresStorage serves a database loaded with
+export_to_postgres.py through psycopg2's ThreadedConnectionPool, using
+server-side prepared statements, a tsvector/GIN index for full-text search
+and pg_trgm for substring search.
+
+app.py talks to both through the same interface:
+
+    acquire() / release(conn)   borrow a connection; conn.cursor() and
+                                conn.execute() take '?' placeholders and
+                                return rows addressable by column name
+    languages(conn)             language columns of the questions table, sorted
+    dataset_version(conn)       (build_id, built_at) of the data being served
+    compile_search(query, substring)
+    search(cursor, search, language, limit, after)
+    search_snippets(cursor, search, language, question_ids)
+    get_stats()                 pool diagnostics
+
+open_storage() picks the backend named by GRANT_STORAGE (sqlite by default).
+acquire() and dataset_version() raise StorageUnavailable when the database
+cannot be reached or has nothing loaded yet; the API answers it with 503.
+"""
+import functools
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from collections import namedtuple
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote
+
+from schema_cache import SYSTEM_COLUMNS, get_schema_cache
+
+try:
+    import psycopg2
+    import psycopg2.extras
+    import psycopg2.pool
+except ImportError:
+    psycopg2 = None
+
+# A "quoted phrase" or a bare term in a search query
+SEARCH_TERM_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+# Characters with a meaning in tsquery syntax, removed from user terms
+TSQUERY_SPECIAL_PATTERN = re.compile(r"[&|!():*<>'\\]")
+
+# Characters of context kept on each side of a substring match
+SNIPPET_CONTEXT = 60
+
+# A compiled search: the user's text, the backend's match expression, and
+# whether it is a substring (rather than full-text) search
+SearchQuery = namedtuple('SearchQuery', ['text', 'expression', 'substring'])
+
+class StorageUnavailable(Exception):
+    """The database cannot be reached, or has no build loaded yet."""
+
+def highlight_substring(content: str, needle: str) -> str:
+    """Snippet of content around the first case-insensitive occurrence of needle."""
+    start = content.casefold().find(needle.casefold())
+    if start < 0:
+        return content[:2 * SNIPPET_CONTEXT]
+    end = start + len(needle)
+    left = max(0, start - SNIPPET_CONTEXT)
+    right = min(len(content), end + SNIPPET_CONTEXT)
+    return ''.join([
+        '…' if left > 0 else '',
+        content[left:start], '<mark>', content[start:end], '</mark>', content[end:right],
+        '…' if right < len(content) else ''
+    ])
+
+def substring_snippets(rows, needle: str) -> Dict[int, List[Dict]]:
+    """Group (question_id, language, content) rows into highlighted matches per question."""
+    matches = {}
+    for row in rows:
+        matches.setdefault(row['question_id'], []).append({
+            'language': row['language'],
+            'snippet': highlight_substring(row['content'], needle)
+        })
+    return matches
+
+def _contains_text(content, needle):
+    """SQLite function behind substring search; needle is already casefolded."""
+    return content is not None and needle in content.casefold()
+
+class ConnectionPool:
+    """Pool of read-only SQLite connections shared by a worker's threads.
+
+    Each request borrows one connection and hands it back when the app
+    context is torn down, so a worker keeps one warm connection (and page
+    cache) per concurrent thread instead of reconnecting on every hit.
+
+    create_database.py publishes new builds by atomically replacing the file,
+    so the pool watches the file's inode: once it changes, idle connections
+    are closed and borrowed ones are closed on release, while requests
+    already running finish against the old file.
+    """
+
+    def __init__(self, db_path, max_idle=8, mmap_size=256 * 1024 * 1024,
+                 cache_kib=16384, immutable=True):
+        self.db_path = db_path
+        self.max_idle = max_idle
+        self.mmap_size = mmap_size
+        self.cache_kib = cache_kib
+        self.immutable = immutable
+        self._idle = []
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = 0
+        self._acquired = 0
+        self._reused = 0
+        self._in_use = 0
+        self._file_id = None
+        self._generation = 0
+        self._generations = {}
+
+    def _check_file(self):
+        """Start a new generation of connections if the file was replaced. Caller holds the lock."""
+        try:
+            st = os.stat(self.db_path)
+        except FileNotFoundError:
+            return []
+        file_id = (st.st_dev, st.st_ino)
+        if file_id == self._file_id:
+            return []
+        if self._file_id is not None:
+            self._generation += 1
+        self._file_id = file_id
+        stale, self._idle = self._idle, []
+        for conn in stale:
+            self._generations.pop(conn, None)
+        self._closed += len(stale)
+        return stale
+
+    def _connect(self):
+        """Open a new read-only connection with the serving pragmas applied."""
+        uri = f'file:{quote(os.path.abspath(self.db_path))}?mode=ro'
+        if self.immutable:
+            # The file is never written while being served, so SQLite can
+            # skip locking and change detection entirely
+            uri += '&immutable=1'
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f'PRAGMA mmap_size = {int(self.mmap_size)}')
+        conn.execute(f'PRAGMA cache_size = {-int(self.cache_kib)}')
+        conn.create_function('contains_text', 2, _contains_text, deterministic=True)
+        return conn
+
+    def acquire(self):
+        """Borrow a connection, reusing an idle one when available."""
+        with self._lock:
+            stale = self._check_file()
+            self._acquired += 1
+            self._in_use += 1
+            conn = None
+            if self._idle:
+                self._reused += 1
+                conn = self._idle.pop()
+            else:
+                self._opened += 1
+            generation = self._generation
+
+        for stale_conn in stale:
+            stale_conn.close()
+        if conn is not None:
+            return conn
+
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._lock:
+                self._opened -= 1
+                self._in_use -= 1
+            raise
+        with self._lock:
+            self._generations[conn] = generation
+        return conn
+
+    def release(self, conn):
+        """Return a borrowed connection to the pool."""
+        with self._lock:
+            self._in_use -= 1
+            if (self._generations.get(conn) == self._generation
+                    and len(self._idle) < self.max_idle):
+                self._idle.append(conn)
+                return
+            self._generations.pop(conn, None)
+            self._closed += 1
+        conn.close()
+
+    def close_all(self):
+        """Close every idle connection."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            for conn in idle:
+                self._generations.pop(conn, None)
+            self._closed += len(idle)
+        for conn in idle:
+            conn.close()
+
+    def get_stats(self):
+        """Return reuse counters for this worker's pool."""
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'db_path': self.db_path,
+                'opened': self._opened,
+                'closed': self._closed,
+                'acquired': self._acquired,
+                'reused': self._reused,
+                'reuse_rate': round(self._reused / self._acquired, 4) if self._acquired else 0.0,
+                'idle': len(self._idle),
+                'in_use': self._in_use,
+                'max_idle': self.max_idle,
+                'generation': self._generation
+            }
+
+class SQLiteStorage:
+    """The SQLite file built by create_database.py."""
+
+    name = 'sqlite'
+    errors = (OSError, sqlite3.Error)
+
+    def __init__(self, db_path, pool_size=8, mmap_size=256 * 1024 * 1024, cache_kib=16384, immutable=True):
+        self.db_path = db_path
+        self.pool = ConnectionPool(db_path, max_idle=pool_size, mmap_size=mmap_size,
+                                   cache_kib=cache_kib, immutable=immutable)
+        self.schema_cache = get_schema_cache(db_path)
+        self._version = {'file_id': None, 'version': None}
+        self._version_lock = threading.Lock()
+
+    def warm(self):
+        """Load the schema metadata ahead of the first request."""
+        self.schema_cache.languages()
+
+    def acquire(self):
+        return self.pool.acquire()
+
+    def release(self, conn):
+        self.pool.release(conn)
+
+    def languages(self, conn=None) -> List[str]:
+        return self.schema_cache.languages(conn)
+
+    def dataset_version(self, conn=None) -> Tuple[str, datetime]:
+        """Get (build_id, built_at) for the database currently being served.
+
+        The build id is written by create_database.py on every build or update,
+        and is re-read only when the database file is replaced or modified.
+        It is read from the current file rather than through conn, which may
+        still have a replaced build open.
+        """
+        st = os.stat(self.db_path)
+        file_id = (st.st_dev, st.st_ino, st.st_mtime_ns)
+        with self._version_lock:
+            if self._version['file_id'] == file_id:
+                return self._version['version']
+
+        conn = sqlite3.connect(f'file:{quote(os.path.abspath(self.db_path))}?mode=ro', uri=True)
+        try:
+            row = conn.execute('SELECT build_id, built_at FROM build_info').fetchone()
+        except sqlite3.OperationalError:
+            # Databases built before build ids existed
+            row = None
+        finally:
+            conn.close()
+
+        if row is not None:
+            version = (row[0], datetime.fromisoformat(row[1]))
+        else:
+            # No build id recorded: fall back to the file itself
+            version = (f'{st.st_ino:x}-{st.st_mtime_ns:x}-{st.st_size:x}',
+                       datetime.fromtimestamp(st.st_mtime, timezone.utc))
+
+        with self._version_lock:
+            self._version['file_id'] = file_id
+            self._version['version'] = version
+        return version
+
+    def compile_search(self, query: str, substring: bool = False) -> Optional[SearchQuery]:
+        """Translate a user search string into an FTS5 MATCH expression.
+
+        Every term is quoted so FTS5 operators typed by users are inert. Quoted
+        text stays a phrase, and a trailing * turns a term into a prefix query.
+        Returns None if the query has no searchable terms.
+        """
+        if substring:
+            text = query.strip()
+            return SearchQuery(text, text.casefold(), True) if text else None
+
+        terms = []
+        for phrase, word in SEARCH_TERM_PATTERN.findall(query):
+            text = phrase if phrase else word
+            is_prefix = text.endswith('*')
+            text = text.rstrip('*').strip()
+            if not text:
+                continue
+            text = text.replace('"', '""')
+            terms.append(f'"{text}"*' if is_prefix else f'"{text}"')
+        return SearchQuery(query, ' '.join(terms), False) if terms else None
+
+    def search(self, cursor, search: SearchQuery, language: Optional[str], limit: int,
+               after: Optional[list] = None) -> List[Tuple[int, float, str]]:
+        """Best-matching questions as (question_id, rank, sort_key), lower rank first.
+
+        Full-text ranks are FTS5's bm25() (lower is better); substring matches
+        all rank 0 and come in sort_key order. Returns up to limit rows after
+        the (rank, sort_key) position given by after.
+        """
+        if search.substring:
+            match_sql, rank_sql = 'contains_text(s.content, ?)', '0.0'
+        else:
+            match_sql, rank_sql = 'search_index MATCH ?', 'MIN(s.rank)'
+        params = [search.expression]
+
+        language_filter = ''
+        if language is not None:
+            language_filter = 'AND s.language = ?'
+            params.append(language)
+
+        # Resume after the (rank, sort_key) of the previous page's last result
+        page_filter = ''
+        if after is not None:
+            page_filter = 'HAVING (best_rank, q.sort_key) > (?, ?)'
+            params.extend(after)
+
+        cursor.execute(f"""
+            SELECT s.question_id, {rank_sql} AS best_rank, q.sort_key
+            FROM search_index s
+            JOIN questions q ON q.id = s.question_id
+            WHERE {match_sql} {language_filter}
+            GROUP BY s.question_id
+            {page_filter}
+            ORDER BY best_rank, q.sort_key
+            LIMIT {int(limit)}
+        """, params)
+        return [(row['question_id'], row['best_rank'], row['sort_key']) for row in cursor.fetchall()]
+
+    def search_snippets(self, cursor, search: SearchQuery, language: Optional[str],
+                        question_ids: List[int]) -> Dict[int, List[Dict]]:
+        """Highlighted snippets for every matching language of the given questions."""
+        params = [search.expression]
+        language_filter = ''
+        if language is not None:
+            language_filter = 'AND language = ?'
+            params.append(language)
+        id_placeholders = ', '.join(['?'] * len(question_ids))
+
+        if search.substring:
+            cursor.execute(f"""
+                SELECT question_id, language, content
+                FROM search_index
+                WHERE contains_text(content, ?) {language_filter}
+                  AND question_id IN ({id_placeholders})
+            """, params + list(question_ids))
+            return substring_snippets(cursor.fetchall(), search.text)
+
+        cursor.execute(f"""
+            SELECT question_id, language,
+                   snippet(search_index, 2, '<mark>', '</mark>', '…', 16) AS snippet
+            FROM search_index
+            WHERE search_index MATCH ? {language_filter}
+              AND question_id IN ({id_placeholders})
+            ORDER BY rank
+        """, params + list(question_ids))
+        matches = {}
+        for row in cursor.fetchall():
+            matches.setdefault(row['question_id'], []).append({
+                'language': row['language'],
+                'snippet': row['snippet']
+            })
+        return matches
+
+    def get_stats(self) -> Dict:
+        """Connection pool and schema cache statistics for this worker process."""
+        stats = self.pool.get_stats()
+        stats['backend'] = self.name
+        stats['schema_cache'] = self.schema_cache.get_stats()
+        return stats
+
+@functools.lru_cache(maxsize=1024)
+def to_positional(sql: str) -> Tuple[str, int]:
+    """Rewrite '?' placeholders outside string literals as $1, $2, ...
+
+    Returns:
+        (rewritten_sql, parameter_count)
+    """
+    parts = []
+    count = 0
+    in_literal = False
+    for char in sql:
+        if char == "'":
+            in_literal = not in_literal
+        elif char == '?' and not in_literal:
+            count += 1
+            parts.append(f'${count}')
+            continue
+        parts.append(char)
+    return ''.join(parts), count
+
+class PostgresCursor:
+    """Cursor running every statement as a server-side prepared statement.
+
+    The first execution of a statement on a connection PREPAREs it; later
+    ones only send EXECUTE with the parameters, so Postgres parses and plans
+    each distinct query once per connection.
+    """
+
+    def __init__(self, connection: 'PostgresConnection'):
+        self.connection = connection
+        self._cursor = connection.raw.cursor(cursor_factory=psycopg2.extras.DictCursor)
+
+    def execute(self, sql: str, params=()):
+        statement, count = to_positional(sql)
+        name = self.connection.prepare(self._cursor, statement)
+        if count:
+            self._cursor.execute(f'EXECUTE {name} ({", ".join(["%s"] * count)})', list(params))
+        else:
+            self._cursor.execute(f'EXECUTE {name}')
+        return self
+
+    def fetchone(self):
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        return self._cursor.fetchall()
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def close(self):
+        self._cursor.close()
+
+class PostgresConnection:
+    """A pooled psycopg2 connection with sqlite3-style cursor() and execute()."""
+
+    def __init__(self, raw, prepared: Dict[str, str], max_prepared: int):
+        self.raw = raw
+        self._prepared = prepared
+        self._max_prepared = max_prepared
+
+    def prepare(self, cursor, statement: str) -> str:
+        """Name of the prepared statement for statement, preparing it if needed."""
+        name = self._prepared.get(statement)
+        if name is not None:
+            return name
+
+        if len(self._prepared) >= self._max_prepared:
+            # Queries with IN lists of many lengths would otherwise grow the
+            # set of prepared statements without bound
+            cursor.execute('DEALLOCATE ALL')
+            self._prepared.clear()
+        name = 'stmt_' + hashlib.sha1(statement.encode('utf-8')).hexdigest()[:16]
+        cursor.execute(f'PREPARE {name} AS {statement}')
+        self._prepared[statement] = name
+        return name
+
+    def cursor(self) -> PostgresCursor:
+        return PostgresCursor(self)
+
+    def execute(self, sql: str, params=()) -> PostgresCursor:
+        return self.cursor().execute(sql, params)
+
+class PostgresStorage:
+    """A Postgres database loaded with export_to_postgres.py."""
+
+    name = 'postgres'
+
+    def __init__(self, dsn, min_connections=1, max_connections=10, max_prepared=256, version_ttl=5.0):
+        if psycopg2 is None:
+            raise RuntimeError('GRANT_STORAGE=postgres needs psycopg2 (pip install psycopg2-binary)')
+        self.errors = (psycopg2.Error,)
+        self.dsn = dsn
+        self.max_prepared = max_prepared
+        self.version_ttl = version_ttl
+        # Opened by the first acquire(), so workers start even while Postgres is down
+        self.pool = None
+        self._pool_lock = threading.Lock()
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+        self._lock = threading.Lock()
+        # Statements prepared on each connection; keyed by the connection
+        # itself so the entry goes away with it when the pool closes it
+        self._prepared = weakref.WeakKeyDictionary()
+        self._acquired = 0
+        self._in_use = 0
+        self._version = {'checked_at': None, 'version': None}
+        self._languages = {'version': None, 'languages': None}
+
+    def warm(self):
+        """Load the language columns ahead of the first request."""
+        conn = self.acquire()
+        try:
+            self.languages(conn)
+        finally:
+            self.release(conn)
+
+    def acquire(self) -> PostgresConnection:
+        try:
+            with self._pool_lock:
+                if self.pool is None:
+                    self.pool = psycopg2.pool.ThreadedConnectionPool(
+                        self.min_connections, self.max_connections, self.dsn)
+            raw = self.pool.getconn()
+        except (psycopg2.OperationalError, psycopg2.pool.PoolError) as e:
+            raise StorageUnavailable(f'Postgres is unavailable: {e}') from e
+        if raw.autocommit is False:
+            # Read-only autocommit sessions never sit idle in a transaction
+            raw.set_session(readonly=True, autocommit=True)
+        with self._lock:
+            self._acquired += 1
+            self._in_use += 1
+            prepared = self._prepared.setdefault(raw, {})
+        return PostgresConnection(raw, prepared, self.max_prepared)
+
+    def release(self, conn: PostgresConnection):
+        # putconn() also closes healthy connections once min_connections are
+        # idle, so look at the connection only after handing it back
+        self.pool.putconn(conn.raw, close=conn.raw.closed != 0)
+        with self._lock:
+            self._in_use -= 1
+            if conn.raw.closed:
+                self._prepared.pop(conn.raw, None)
+
+    def languages(self, conn=None) -> List[str]:
+        """Language columns of the questions table, re-read once per dataset version."""
+        own_conn = conn is None
+        if own_conn:
+            conn = self.acquire()
+        try:
+            build_id, _ = self.dataset_version(conn)
+            with self._lock:
+                if self._languages['version'] == build_id:
+                    return list(self._languages['languages'])
+
+            rows = conn.execute("""
+                SELECT column_name
+                FROM information_schema.columns
+                WHERE table_schema = current_schema() AND table_name = 'questions'
+            """).fetchall()
+        finally:
+            if own_conn:
+                self.release(conn)
+        languages = sorted(row[0] for row in rows if row[0] not in SYSTEM_COLUMNS)
+
+        with self._lock:
+            self._languages = {'version': build_id, 'languages': languages}
+        return list(languages)
+
+    def dataset_version(self, conn=None) -> Tuple[str, datetime]:
+        """Get (build_id, built_at) of the loaded data, re-read at most every version_ttl seconds.
+
+        Reads through conn if given, otherwise through a connection of its
+        own. If build_info has no row, the last version read is kept; with
+        none, raises StorageUnavailable.
+        """
+        now = time.monotonic()
+        with self._lock:
+            checked_at = self._version['checked_at']
+            if checked_at is not None and now - checked_at < self.version_ttl:
+                return self._version['version']
+
+        own_conn = conn is None
+        if own_conn:
+            conn = self.acquire()
+        try:
+            row = conn.execute('SELECT build_id, built_at FROM build_info').fetchone()
+        finally:
+            if own_conn:
+                self.release(conn)
+
+        if row is None:
+            with self._lock:
+                if self._version['version'] is not None:
+                    return self._version['version']
+            raise StorageUnavailable('build_info is empty; load the database with export_to_postgres.py')
+        version = (row['build_id'], datetime.fromisoformat(row['built_at']))
+
+        with self._lock:
+            self._version = {'checked_at': now, 'version': version}
+        return version
+
+    def compile_search(self, query: str, substring: bool = False) -> Optional[SearchQuery]:
+        """Translate a user search string into a tsquery (or an ILIKE pattern).
+
+        Terms are ANDed, "quoted text" becomes a <-> phrase and a trailing *
+        a :* prefix match. Returns None if the query has no searchable terms.
+        """
+        if substring:
+            text = query.strip()
+            if not text:
+                return None
+            escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            return SearchQuery(text, f'%{escaped}%', True)
+
+        terms = []
+        for phrase, word in SEARCH_TERM_PATTERN.findall(query):
+            text = phrase if phrase else word
+            is_prefix = text.endswith('*')
+            words = TSQUERY_SPECIAL_PATTERN.sub(' ', text).split()
+            if not words:
+                continue
+            lexemes = [f"'{w}'" for w in words]
+            if is_prefix:
+                lexemes[-1] += ':*'
+            terms.append(' <-> '.join(lexemes) if len(lexemes) > 1 else lexemes[0])
+        return SearchQuery(query, ' & '.join(f'({term})' for term in terms), False) if terms else None
+
+    def search(self, cursor, search: SearchQuery, language: Optional[str], limit: int,
+               after: Optional[list] = None) -> List[Tuple[int, float, str]]:
+        """Best-matching questions as (question_id, rank, sort_key), lower rank first.
+
+        Full-text ranks are -ts_rank_cd() so that, as with SQLite's bm25(),
+        lower is better; substring matches (ILIKE, served by the pg_trgm
+        index) all rank 0 and come in sort_key order.
+        """
+        if search.substring:
+            source = 'search_documents d'
+            match_sql, rank_sql = 'd.content ILIKE ?', '0.0::float8'
+        else:
+            source = "search_documents d CROSS JOIN to_tsquery('simple', ?) AS query"
+            match_sql, rank_sql = 'd.document @@ query', 'MIN(-ts_rank_cd(d.document, query))::float8'
+        params = [search.expression]
+
+        language_filter = ''
+        if language is not None:
+            language_filter = 'AND d.language = ?'
+            params.append(language)
+
+        page_filter = ''
+        if after is not None:
+            page_filter = 'WHERE (best_rank, sort_key) > (?::float8, ?)'
+            params.extend(after)
+
+        cursor.execute(f"""
+            SELECT question_id, best_rank, sort_key
+            FROM (
+                SELECT d.question_id, {rank_sql} AS best_rank, q.sort_key
+                FROM {source}
+                JOIN questions q ON q.id = d.question_id
+                WHERE {match_sql} {language_filter}
+                GROUP BY d.question_id, q.sort_key
+            ) ranked
+            {page_filter}
+            ORDER BY best_rank, sort_key
+            LIMIT {int(limit)}
+        """, params)
+        return [(row['question_id'], row['best_rank'], row['sort_key']) for row in cursor.fetchall()]
+
+    def search_snippets(self, cursor, search: SearchQuery, language: Optional[str],
+                        question_ids: List[int]) -> Dict[int, List[Dict]]:
+        """Highlighted snippets for every matching language of the given questions."""
+        params = [search.expression]
+        language_filter = ''
+        if language is not None:
+            language_filter = 'AND d.language = ?'
+            params.append(language)
+        id_placeholders = ', '.join(['?'] * len(question_ids))
+
+        if search.substring:
+            cursor.execute(f"""
+                SELECT d.question_id, d.language, d.content
+                FROM search_documents d
+                WHERE d.content ILIKE ? {language_filter}
+                  AND d.question_id IN ({id_placeholders})
+            """, params + list(question_ids))
+            return substring_snippets(cursor.fetchall(), search.text)
+
+        cursor.execute(f"""
+            SELECT d.question_id, d.language,
+                   ts_headline('simple', d.content, query,
+                               'StartSel=<mark>, StopSel=</mark>, MaxWords=16, MinWords=8, FragmentDelimiter=…') AS snippet
+            FROM search_documents d CROSS JOIN to_tsquery('simple', ?) AS query
+            WHERE d.document @@ query {language_filter}
+              AND d.question_id IN ({id_placeholders})
+            ORDER BY ts_rank_cd(d.document, query) DESC
+        """, params + list(question_ids))
+        matches = {}
+        for row in cursor.fetchall():
+            matches.setdefault(row['question_id'], []).append({
+                'language': row['language'],
+                'snippet': row['snippet']
+            })
+        return matches
+
+    def get_stats(self) -> Dict:
+        """Connection pool statistics for this worker process."""
+        with self._lock:
+            return {
+                'backend': self.name,
+                'pid': os.getpid(),
+                'acquired': self._acquired,
+                'in_use': self._in_use,
+                'max_connections': self.max_connections,
+                'connections_with_prepared_statements': len(self._prepared),
+                'prepared_statements': sum(len(names) for names in self._prepared.values())
+            }
+
+def open_storage():
+    """Open the backend selected by the environment.
+
+    GRANT_STORAGE=postgres serves DATABASE_URL; otherwise the local file
+    (GRANT_DB_PATH) is served, whether or not DATABASE_URL is set.
+    """
+    backend = os.environ.get('GRANT_STORAGE', 'sqlite').lower()
+    if backend not in ('sqlite', 'postgres'):
+        raise ValueError(f'GRANT_STORAGE must be sqlite or postgres, not {backend!r}')
+
+    if backend == 'postgres':
+        database_url = os.environ.get('DATABASE_URL')
+        if not database_url:
+            raise RuntimeError('GRANT_STORAGE=postgres needs DATABASE_URL')
+        return PostgresStorage(
+            database_url,
+            min_connections=int(os.environ.get('GRANT_PG_POOL_MIN', 1)),
+            max_connections=int(os.environ.get('GRANT_PG_POOL_MAX', 10)),
+            max_prepared=int(os.environ.get('GRANT_PG_MAX_PREPARED', 256)),
+            version_ttl=float(os.environ.get('GRANT_PG_VERSION_TTL', 5))
+        )
+
+    return SQLiteStorage(
+        os.environ.get('GRANT_DB_PATH', 'grant_database.db'),
+        pool_size=int(os.environ.get('GRANT_DB_POOL_SIZE', 8)),
+        mmap_size=int(os.environ.get('GRANT_DB_MMAP_SIZE', 256 * 1024 * 1024)),
+        cache_kib=int(os.environ.get('GRANT_DB_CACHE_KIB', 16384)),
+        immutable=os.environ.get('GRANT_DB_IMMUTABLE', '1') != '0'
+    )
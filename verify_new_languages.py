@@ -2,6 +2,7 @@
 Quick verification script for the new languages (abaza and turkish)
 """
 import sqlite3
+from schema_cache import get_schema_cache
 
 def verify_languages():
     conn = sqlite3.connect('grant_database.db')
@@ -12,8 +13,7 @@ def verify_languages():
     print("=" * 60)
     
     # Check columns exist
-    cursor.execute('PRAGMA table_info(questions)')
-    columns = [row[1] for row in cursor.fetchall()]
+    columns = get_schema_cache('grant_database.db').columns(conn)
     
     print("\n1. Checking if columns exist...")
     abaza_exists = 'abaza' in columns